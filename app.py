@@ -1,15 +1,24 @@
 import streamlit as st
 import minizinc
 import pandas as pd
-import datetime
 import subprocess
-import os
 import tarfile
+import hashlib
 import requests
 from pathlib import Path
 import sys
 from random import randint
 import json
+import time
+import diagnostics
+import engine
+import export
+import feasibility
+import symmetry
+import views
+from cache import ResultCache
+from flatzinc import FlatZincCache
+from jobs import ACTIFS, EN_ATTENTE, JobQueue
 
 MINIZINC_VERSION = "2.9.4"
 MINIZINC_INSTALL_DIR = Path("/tmp/minizinc_install")
@@ -61,11 +70,29 @@ def process_config_upload():
         st.session_state.loaded_config = {}
         st.session_state.last_uploaded_filename = None
 
+def bundle_checksums(bundle_dir):
+    # Empreintes sha256 des exécutables du bundle (minizinc et solveurs)
+    bin_dir = bundle_dir / "bin"
+    return {p.name: hashlib.sha256(p.read_bytes()).hexdigest() for p in sorted(bin_dir.iterdir()) if p.is_file()}
+
+def bundle_is_valid(bundle_dir, manifest_path):
+    if not manifest_path.exists() or not (bundle_dir / "bin").is_dir():
+        return False
+    try:
+        return json.loads(manifest_path.read_text()) == bundle_checksums(bundle_dir)
+    except (OSError, ValueError):
+        return False
+
 @st.cache_resource
 def setup_minizinc(version, install_dir, executable_path, archive_name_arg, download_url_arg):
-    if executable_path.exists():
-        try: subprocess.run(['chmod', '+x', str(executable_path)], check=True, timeout=5)
-        except Exception: pass
+    # Une fois par processus : le bundle déjà extrait est vérifié contre les empreintes
+    # enregistrées à l'extraction, et réinstallé s'il est incomplet ou modifié.
+    bundle_dir = executable_path.parent.parent
+    manifest_path = install_dir / f"{bundle_dir.name}.sha256.json"
+    if executable_path.exists() and not manifest_path.exists():
+        # Bundle extrait avant l'introduction des empreintes : on l'adopte tel quel
+        manifest_path.write_text(json.dumps(bundle_checksums(bundle_dir)))
+    if executable_path.exists() and bundle_is_valid(bundle_dir, manifest_path):
         return executable_path
     install_dir.mkdir(parents=True, exist_ok=True)
     archive_path = install_dir / archive_name_arg
@@ -80,6 +107,7 @@ def setup_minizinc(version, install_dir, executable_path, archive_name_arg, down
         if archive_path.exists(): archive_path.unlink()
         if executable_path.exists():
             subprocess.run(['chmod', '+x', str(executable_path)], check=True, timeout=5)
+            manifest_path.write_text(json.dumps(bundle_checksums(bundle_dir)))
             return executable_path
         else:
             st.error(f"Exécutable MiniZinc introuvable: {executable_path}")
@@ -88,23 +116,35 @@ def setup_minizinc(version, install_dir, executable_path, archive_name_arg, down
         st.error(f"Échec install MiniZinc: {e}")
         return None
 
-minizinc_exe_path_obj = setup_minizinc(MINIZINC_VERSION, MINIZINC_INSTALL_DIR, MINIZINC_EXECUTABLE, archive_name, download_url)
-if minizinc_exe_path_obj:
+@st.cache_resource
+def get_solver():
+    # Driver, version et solveur : créés au premier lancement d'une résolution puis
+    # partagés par toutes les sessions, au lieu d'être recréés à chaque relance du script.
+    minizinc_exe_path_obj = setup_minizinc(MINIZINC_VERSION, MINIZINC_INSTALL_DIR, MINIZINC_EXECUTABLE, archive_name, download_url)
+    if not minizinc_exe_path_obj:
+        raise RuntimeError("Échec install MiniZinc.")
+    driver = minizinc.Driver(minizinc_exe_path_obj)
+    minizinc.default_driver = driver
     try:
-        driver = minizinc.Driver(minizinc_exe_path_obj)
-        minizinc.default_driver = driver
-        try:
-             result_ver = subprocess.run([str(minizinc_exe_path_obj), '--version'], capture_output=True, text=True, check=True, timeout=10)
-        except Exception:
-             st.sidebar.warning("Impossible de vérifier version MiniZinc.")
-        solver = minizinc.Solver.lookup("cp-sat")
-    except Exception as e:
-        st.error(f"Erreur config driver/solveur: {e}")
-        st.stop()
-else:
-    st.error("Échec install MiniZinc.")
-    st.stop()
-# solver = minizinc.Solver.lookup("cp-sat")
+        version = subprocess.run([str(minizinc_exe_path_obj), '--version'], capture_output=True, text=True, check=True, timeout=10).stdout.strip()
+    except Exception:
+        version = None
+    engine.prepare_ortools_env()
+    return minizinc.Solver.lookup(engine.DEFAULT_SOLVER), version
+
+@st.cache_resource
+def get_result_cache():
+    return ResultCache()
+
+@st.cache_resource
+def get_flatzinc_cache():
+    return FlatZincCache()
+
+@st.cache_resource
+def get_job_queue():
+    # Une seule file pour toutes les sessions : plafonne le total des threads solveur du serveur
+    return JobQueue()
+
 st.set_page_config(layout="wide")
 st.title("Solveur d'Emploi du Temps 📅")
 with st.sidebar:
@@ -123,6 +163,32 @@ with st.sidebar:
         st.error(f"Erreur lecture JSON: {st.session_state.pop('config_load_error')}")
     config = st.session_state.get("loaded_config", {})
     timeout_secondes = st.slider("Timeout (sec)", 5, 600, config.get("timeout", 5), 5)
+    mode_labels = {"pondere": "Objectif pondéré", "lexicographique": "Lexicographique (un critère par étape)",
+                   "lns": "Grand voisinage (LNS, grosses instances)",
+                   "portefeuille": "Portefeuille de solveurs en course",
+                   "deux_phases": "Deux phases (salles affectées après coup)",
+                   "groupes": "Groupes de classes en parallèle"}
+    solve_mode = st.selectbox("Mode d'optimisation", list(mode_labels), format_func=mode_labels.get,
+                              help="Le mode lexicographique minimise d'abord le nombre de profs, puis fixe cette valeur et optimise les trous, etc.")
+    groupes_classes = config.get("groupes_classes")
+    if solve_mode == "groupes":
+        groupes_texte = st.text_input("Groupes de classes", "; ".join(", ".join(map(str, g)) for g in groupes_classes or []),
+                                      placeholder="1, 2, 3; 4, 5, 6",
+                                      help="Classes sans prof commun, séparées par des virgules, groupes séparés par des points-virgules. Vide : groupes automatiques.")
+        try:
+            groupes_classes = [[int(c) for c in g.split(",")] for g in groupes_texte.split(";") if g.strip()] or None
+        except ValueError:
+            st.error("Groupes de classes : numéros de classes attendus, par exemple « 1, 2, 3; 4, 5, 6 ».")
+            groupes_classes = None
+    model_labels = {"complet": "Complet (planning.mzn)", "allege": "Allégé, contraintes globales (planning_lean.mzn)"}
+    model_choice = st.selectbox("Modèle", list(model_labels), format_func=model_labels.get,
+                                help="Les deux modèles ont les mêmes contraintes et le même objectif ; le modèle allégé s'aplatit plus vite.")
+    use_symmetries = st.checkbox("Bris de symétrie", value=False,
+                                 help="Ordonne les profs, classes et salles interchangeables (mêmes contraintes) : même optimum, preuve d'optimalité souvent plus rapide.")
+    use_warm_start = st.checkbox("Démarrage à chaud", value=True,
+                                 help="Propose la solution précédente au solveur comme point de départ (utile après une petite modification).")
+    use_cache = st.checkbox("Réutiliser un résultat déjà calculé", value=True,
+                            help="Même configuration, même modèle : le résultat enregistré est réutilisé s'il est optimal ou obtenu avec un timeout au moins aussi long.")
 
     tab_general, tab_classes, tab_salles, tab_profs, tab_cours = st.tabs(
         ["Général", "Classes", "Salles", "Professeurs", "Cours"]
@@ -265,6 +331,8 @@ with st.sidebar:
         "timeout": timeout_secondes,
         "nombre_heures_cours": saved_opts
     }
+    if groupes_classes:
+        config_data_to_save["groupes_classes"] = groupes_classes
     config_json = json.dumps(config_data_to_save, indent=2)
 
     st.download_button(
@@ -274,213 +342,220 @@ with st.sidebar:
         mime="application/json",
     )
 
+def vues_solution(solution):
+    # Décodage et grilles d'occupation calculés une fois par solution : les relances du
+    # script (changement d'entité affichée...) les réutilisent. L'archive d'export est
+    # construite au premier affichage du bouton, puis gardée avec le reste.
+    memo = st.session_state.get("vues_solution")
+    if memo is None or memo["solution"] is not solution:
+        decoded = views.decode_solution(solution)
+        memo = {"solution": solution, "decoded": decoded, "grilles": views.occupations(decoded), "zip": None}
+        st.session_state.vues_solution = memo
+    return memo
+
+def afficher_planning(vues, solution):
+    # Une seule entité rendue à la fois (classe, prof ou salle choisie)
+    decoded, grilles = vues["decoded"], vues["grilles"]
+    jours_config = {jour: st.column_config.TextColumn(width="small") for jour in views.JOURS} # smaller width
+    profs = views.recruited(decoded)
+    vue = st.radio("Afficher", ["Classes", f"Professeurs ({len(profs)})", "Salles"], horizontal=True, key="vue_type")
+    if vue == "Classes":
+        c = st.selectbox("Classe", range(len(decoded["matiere"])), format_func=lambda c: f"Classe {c+1}", key="vue_classe")
+        st.markdown(views.class_table(decoded, c), unsafe_allow_html=True)
+    elif vue == "Salles":
+        if not solution.get("planning_salle"):
+            st.warning("Variable 'planning_salle' non trouvée."); return
+        i = st.selectbox("Salle", views.ROOMS, format_func=lambda i: engine.SALLES[i], key="vue_salle")
+        st.dataframe(views.room_frame(decoded, grilles, i), column_config=jours_config, width="stretch")
+    elif not profs:
+        st.warning("Variables profs incomplètes pour plannings.")
+    else:
+        p = st.selectbox("Professeur", profs, format_func=lambda p: f"P{p+1}", key="vue_prof")
+        st.caption(f"Compétences : {', '.join(views.competences(decoded, p))}")
+        st.dataframe(views.teacher_frame(decoded, grilles, p), column_config=jours_config, width="stretch")
+
+def afficher_resultat(result, en_cours=False):
+    if result is not None:
+        if engine.has_solution(result):
+            status_message = f"Statut: {result['status']}"
+            if en_cours: st.info(f"⏳ Recherche en cours... meilleure solution après {result['elapsed']:.1f}s ({status_message})")
+            elif not result.get("final", True): st.warning("⏹️ Résolution interrompue : la meilleure solution trouvée est conservée.")
+            elif result["status"] == "OPTIMAL_SOLUTION": st.success(f"🎉 Optimal! ({status_message})")
+            elif result["status"] == "SATISFIED": st.warning(f"⚠️ Timeout! Meilleure solution. ({status_message})")
+            else: st.info(f"Terminé. ({status_message})")
+            if result.get("cached"): st.caption("Résultat issu du cache.")
+
+            st.info(f"Score objectif = {result['objective']}")
+            if result.get("stage"): st.caption(f"Étape en cours : {result['stage']}")
+            if result.get("stages"):
+                st.dataframe(pd.DataFrame(result["stages"]), hide_index=True)
+            if result.get("member"): st.caption(f"Solution trouvée par : {result['member']}")
+            if result.get("portfolio"):
+                st.dataframe(pd.DataFrame(result["portfolio"]), hide_index=True)
+            if result.get("lns"):
+                lns = result["lns"]
+                st.caption(f"LNS : {lns['iterations']} itérations")
+                st.dataframe(pd.DataFrame(lns["voisinages"]).T, use_container_width=True)
+            if result.get("deux_phases"):
+                phases = result["deux_phases"]
+                st.caption(f"Deux phases : {phases['tours']} résolution(s), {phases['coupes']} coupe(s) sur les salles")
+            if result.get("groupes"):
+                groupes = result["groupes"]
+                st.caption(f"Groupes : salles {groupes['salles']}, classes replanifiées : "
+                           f"{', '.join(map(str, groupes['classes_reparees'])) or 'aucune'}")
+                st.dataframe(pd.DataFrame(groupes["groupes"]), hide_index=True)
+            timeline = result.get("timeline") or []
+            if len(timeline) > 1:
+                st.line_chart(pd.DataFrame(timeline, columns=["Temps (s)", "Objectif"]).set_index("Temps (s)"))
+            with st.expander("Diagnostics"):
+                resume = diagnostics.summarize(result)
+                st.dataframe(pd.DataFrame({"Valeur": {k: str(v) for k, v in resume.items() if v is not None}}),
+                             use_container_width=True)
+                if result.get("statistics"):
+                    st.json(result["statistics"], expanded=False)
+            solution = result["solution"]
+            if not solution.get("planning"):
+                st.warning("Variable 'planning' non trouvée."); return
+            vues = vues_solution(solution)
+            if en_cours:
+                # Rendu répété pendant la recherche : aperçu de la première classe, sans widgets
+                st.subheader("Classe 1 (aperçu)")
+                st.markdown(views.class_table(vues["decoded"], 0), unsafe_allow_html=True)
+                return
+            if vues["zip"] is None:
+                vues["zip"] = export.export_zip(vues["decoded"])
+            st.download_button("Exporter tous les plannings (zip : NPZ, Parquet, CSV et ICS)", vues["zip"],
+                               file_name="plannings.zip", mime="application/zip", icon="📦", key="export_zip")
+            st.header("Plannings")
+            afficher_planning(vues, solution)
+
+        elif result and result.get("infeasible"):
+            st.error("Configuration infaisable (détectée avant la résolution) :")
+            for probleme in result["infeasible"]:
+                st.markdown(f"- **{probleme['groupe']}** : {probleme['message']}")
+        elif result and result["status"] == "UNSATISFIABLE":
+            st.error(f"UNSAT avec ces paramètres. Statut: {result['status']}")
+        elif result:
+            st.error(f"Pas de solution retournée. Statut: {result['status']}")
+        else:
+            st.error("Résolution échouée ou aucun résultat, peut-être que les contraintes sont trop strictes (réessayez en augmentant le timeout ou en assouplissant les contraintes).")
+    elif not st.session_state.get("solve_error", False):
+        st.info("Configurez les paramètres et lancez la résolution.")
+
+def contraintes_ajoutees(config):
+    # Mêmes contraintes que celles ajoutées par engine : bris de symétrie (option) et borne sur le nombre de profs
+    extra = symmetry.symmetry_constraints(config) if use_symmetries else []
+    return extra + feasibility.bound_constraints(config)
+
+# Pré-vérification instantanée (conditions nécessaires, voir feasibility.py)
+verification = feasibility.check(config_data_to_save)
+if verification["problems"]:
+    st.warning("Cette configuration est infaisable, inutile de lancer le solveur :\n\n"
+               + "\n".join(f"- **{p['groupe']}** : {p['message']}" for p in verification["problems"]))
+else:
+    st.caption(f"Pré-vérification réussie : au moins {verification['min_profs']} professeurs nécessaires.")
+
 # --- Bouton de Lancement et Logique de Résolution ---
-if st.button(f"Lancer la résolution ({num_classes_input} classes, max {timeout_secondes} sec)", icon="▶️"):
-    if solver is None: st.error("Solveur non configuré."); st.stop()
+lancer = st.button(f"Lancer la résolution ({num_classes_input} classes, max {timeout_secondes} sec)", icon="▶️")
+stop_area = st.empty()
+progress_area = st.empty()
+st.header("Résultat de la résolution")
+result_area = st.empty()
 
+if lancer:
     try:
-        model = minizinc.Model("./planning.mzn")
-        inst = minizinc.Instance(solver, model)
-        inst["CLASS"] = range(1, num_classes_input + 1)
-        inst["taille_classe"] = tailles_classes_input
-        inst["PROFS"] = range(1, nombre_profs_input + 1)
-        inst["nombre_heures_jour"] = nombre_heures_jour_input
-        inst["DAY"] = range(1, nombre_heures_jour_input + 1)
-        inst["WEEK"] = range(1, 5 + 1)
-        inst["capacite_salle"] = capacites_salles_input
-        inst["interdictions"] = interdictions_input
-        inst["affectations"] = affectations_input_mzn
-        inst["nombre_heures_cours"] = saved_opts
-
-    except Exception as e: st.error(f"Erreur création instance: {e}"); st.stop()
-
-    result_placeholder = st.empty()
-    with st.spinner(f"Calcul en cours... ({num_classes_input} classes, max {timeout_secondes}s)"):
-        solve_result = None
-        try:
-            try:
-                import ortools
-                ortools_dir = Path(ortools.__file__).parent
-                lib_paths = [str(p) for p in [ortools_dir, ortools_dir / ".libs"] if p.is_dir()]
-                if lib_paths:
-                    ld_path = os.environ.get('LD_LIBRARY_PATH', '')
-                    new_ld = ":".join(lib_paths)
-                    if ld_path: new_ld = new_ld + ":" + ld_path
-                    os.environ['LD_LIBRARY_PATH'] = new_ld
-            except Exception: pass
-
-            solve_result = inst.solve(
-                processes=8,
-                timeout=datetime.timedelta(seconds=timeout_secondes)
-            )
-            st.session_state.minizinc_result = solve_result
+        solver, minizinc_version = get_solver()
+    except Exception as e:
+        st.error(f"Erreur config driver/solveur: {e}")
+        st.stop()
+    if minizinc_version is None: st.warning("Impossible de vérifier version MiniZinc.")
+    previous = st.session_state.minizinc_result
+    warm_start = previous["solution"] if use_warm_start and engine.has_solution(previous) else None
+    st.session_state.minizinc_result = None
+    st.session_state.job_id = get_job_queue().submit(
+        config_data_to_save, solver, model_path=engine.MODELS[model_choice], timeout=timeout_secondes,
+        mode=solve_mode, warm_start=warm_start, symmetries=use_symmetries,
+        cache=get_result_cache() if use_cache else None, flat_cache=get_flatzinc_cache(),
+    )
 
+# La résolution tourne en arrière-plan dans la file partagée ; la session ne fait
+# que suivre son travail. Un clic sur « Arrêter » relance le script et annule le
+# travail ; la meilleure solution trouvée est conservée.
+job_id = st.session_state.get("job_id")
+if job_id:
+    jobs = get_job_queue()
+    if stop_area.button("Arrêter et garder la meilleure solution", icon="⏹️", key="stop_job"):
+        jobs.cancel(job_id)
+    job = jobs.get(job_id)
+    last_render, shown = 0.0, None
+    while job is not None and job["state"] in ACTIFS:
+        if job["state"] == EN_ATTENTE:
+            progress_area.caption(f"⏳ En file d'attente (position {job['position']}) : le serveur est occupé par d'autres résolutions.")
+        else:
+            progress_area.caption(f"⏱️ {time.time() - job['started']:.0f}s écoulées")
+        res = job["result"]
+        if res is None and shown is None:
+            with result_area.container():
+                st.info(f"⏳ Calcul en cours... ({num_classes_input} classes, max {timeout_secondes}s), en attente d'une première solution.")
+            shown = "attente"
+        elif res is not None and res is not shown and time.monotonic() - last_render >= 1.0:
+            st.session_state.minizinc_result = res
+            with result_area.container():
+                afficher_resultat(res, en_cours=True)
+            last_render, shown = time.monotonic(), res
+        time.sleep(0.5)
+        job = jobs.get(job_id)
+    st.session_state.job_id = None
+    stop_area.empty()
+    progress_area.empty()
+    if job is not None:
+        st.session_state.minizinc_result = job["result"]
+        if job["error"]:
+            st.error(f"Erreur pendant la résolution: {job['error']}")
+
+with result_area.container():
+    afficher_resultat(st.session_state.minizinc_result)
+
+resultat = st.session_state.minizinc_result
+if resultat and resultat["status"] == "UNSATISFIABLE" and not resultat.get("infeasible"):
+    if st.button("Expliquer l'infaisabilité", icon="🔍", key="explain_unsat"):
+        try:
+            get_solver()
+            config = engine.normalize_config(config_data_to_save)
+            with st.spinner("Recherche d'un ensemble minimal de contraintes incompatibles (findMUS)..."):
+                groupes = feasibility.explain_unsat(config, engine.MODELS[model_choice], contraintes_ajoutees(config),
+                                                    timeout=max(60, timeout_secondes))
         except Exception as e:
-            st.session_state.minizinc_result = None
-            st.error(f"Erreur pendant la résolution: {e}")
-            st.exception(e)
-st.header("Résultat de la résolution")
-
-if st.session_state.minizinc_result is not None:
-    result = st.session_state.minizinc_result
-
-    if result and result.solution:
-        status_message = f"Statut: {result.status}"
-        if result.status == minizinc.Status.OPTIMAL_SOLUTION: st.success(f"🎉 Optimal! ({status_message})")
-        elif result.status == minizinc.Status.SATISFIED: st.warning(f"⚠️ Timeout! Meilleure solution. ({status_message})")
-        else: st.info(f"Terminé. ({status_message})")
-
-        st.info(f"Score objectif = {result.objective}")
-        solution = result.solution
-
-        jours = ["Lundi", "Mardi", "Mercredi", "Jeudi", "Vendredi"]
-        nombre_heures = 0
-        heures = [] # Sera défini plus bas
-
-        def style_cell_html(cell_value):
-            if not cell_value or cell_value == "": return '<span style="color: #555;"></span>'
-            lines = cell_value.split('\n')
-            matiere = lines[0]
-            color = "#FAFAFA"; weight = "normal"
-            if matiere in ["Mathematiques","Physique","EnseignementScientifique"]: color="#87CEFA"; weight="bold"
-            elif matiere in ["Anglais","Espagnol"]: color="#90EE90"
-            elif matiere in ["HistoireGeographie","Philosophie"]: color="#FFDAB9"
-            elif matiere in ["EPS","Option"]: color="#D8BFD8"
-            html_content = cell_value.replace('\n', '<br>')
-            return f'<span style="color: {color}; font-weight: {weight};">{html_content}</span>'
-
-        # Planning Classe
-        if hasattr(solution, "planning"):
-            planning_data = solution.planning
-            num_classes_sol = len(planning_data)
-            if num_classes_sol > 0 and planning_data[0] is not None and len(planning_data[0]) > 0:
-                nombre_heures = len(planning_data[0])
-                heures = [f"H{d} ({d+7}h)" for d in range(1, nombre_heures + 1)]
-                planning_salle_data = getattr(solution, "planning_salle", None)
-                prof_to_class_data = getattr(solution, "prof_to_class", None)
-                prefs_data = getattr(solution, "prefs", None)
-                obj_prof_used_value = sum(getattr(solution, "prof_est_utilise", [0]))
-                profs_indices = range(obj_prof_used_value)
-
-                st.header("Plannings par Classe")
-                for c in range(num_classes_sol):
-                    st.subheader(f"Classe {c+1}")
-                    planning_display_list = [["" for _ in jours] for _ in range(nombre_heures)]
-                    for d in range(nombre_heures):
-                        for w in range(len(jours)):
-                            cell_text_raw = ""
-                            if c<len(planning_data) and d<len(planning_data[c]) and w<len(planning_data[c][d]):
-                                matiere_obj = planning_data[c][d][w]
-                                if matiere_obj is not None:
-                                     matiere_name = str(matiere_obj)
-                                     if matiere_name != "Void":
-                                         salle_name = ""
-                                         prof_name = ""
-                                         if planning_salle_data and c<len(planning_salle_data) and d<len(planning_salle_data[c]) and w<len(planning_salle_data[c][d]):
-                                             salle_obj = planning_salle_data[c][d][w]
-                                             if salle_obj is not None and str(salle_obj) != "Empty": salle_name = str(salle_obj)
-                                         if prof_to_class_data and prefs_data and matiere_name in matieres_map:
-                                             matiere_index = matieres_map[matiere_name]
-                                             for p_index in profs_indices:
-                                                 if p_index<len(prof_to_class_data) and c<len(prof_to_class_data[p_index]) and \
-                                                    prof_to_class_data[p_index][c]==1 and p_index<len(prefs_data) and \
-                                                    matiere_index<len(prefs_data[p_index]) and prefs_data[p_index][matiere_index]==1:
-                                                     prof_name = f"P{p_index+1}"; break
-                                         cell_text_raw = matiere_name
-                                         if prof_name: cell_text_raw += f"\n({prof_name})"
-                                         if salle_name: cell_text_raw += f"\n[{salle_name}]"
-                            planning_display_list[d][w] = style_cell_html(cell_text_raw)
-                    df = pd.DataFrame(planning_display_list, columns=jours, index=heures)
-                    st.markdown(df.to_html(escape=False, index=True), unsafe_allow_html=True)
-            else: st.warning("Données planning vides.")
-        else: st.warning("Variable 'planning' non trouvée.")
-
-        if not heures:
-             try:
-                 nombre_heures_mzn = inst["nombre_heures_jour"]
-                 if nombre_heures_mzn > 0: nombre_heures=nombre_heures_mzn; heures=[f"H{d}({d+7}h)" for d in range(1, nombre_heures + 1)]
-                 else: st.error("Nb heures invalide."); st.stop()
-             except KeyError: st.error("'nombre_heures_jour' manquant."); st.stop()
-
-        # Professeurs
-        if (hasattr(solution, "prof_est_utilise") and hasattr(solution, "prefs") and
-            hasattr(solution, "planning_prof") and hasattr(solution, "planning") and
-            'planning_data' in locals() and hasattr(solution, "prof_to_class") and heures):
-
-            obj_prof_used_value = sum(solution.prof_est_utilise)
-            prefs_data = solution.prefs
-            prof_to_class_data = solution.prof_to_class
-            num_classes_sol = len(planning_data)
-            st.header(f"Recrutement & Plannings ({obj_prof_used_value} professeurs)")
-            profs_indices = range(obj_prof_used_value)
-
-            prefs_display = []
-            for p_index in profs_indices:
-                competences = []
-                if p_index < len(prefs_data):
-                    if prefs_data[p_index] is not None and len(prefs_data[p_index]) > len(matieres):
-                        for i in range(len(matieres)):
-                            if prefs_data[p_index][i] == 1: competences.append(matieres[i])
-                if not competences: competences = ["(Aucune)"]
-                prefs_display.append(f"Prof P{p_index+1} : {', '.join(competences)}")
-            st.subheader("Compétences recrutées:"); st.text("\n".join(prefs_display))
-
-            st.subheader("Plannings professeurs:")
-            for p_index in profs_indices:
-                st.write(f"**Prof P{p_index+1}**")
-                prof_schedule_display = [["" for _ in jours] for _ in range(nombre_heures)]
-                for d in range(nombre_heures):
-                    for w in range(len(jours)):
-                        for c in range(num_classes_sol):
-                            if c<len(planning_data) and d<len(planning_data[c]) and w<len(planning_data[c][d]):
-                                matiere_obj = planning_data[c][d][w]
-                                if matiere_obj is not None:
-                                    if p_index<len(prof_to_class_data) and c<len(prof_to_class_data[p_index]):
-                                        is_assigned = (prof_to_class_data[p_index][c] == 1)
-                                        if not is_assigned: continue
-                                    matiere_name = str(matiere_obj)
-                                    if matiere_name in matieres_map:
-                                        matiere_index = matieres_map[matiere_name]
-                                        if p_index<len(prefs_data) and matiere_index<len(prefs_data[p_index]):
-                                            is_competent = (prefs_data[p_index][matiere_index] == 1)
-                                            if is_competent: prof_schedule_display[d][w] = f"Classe {c+1}"; break
-                df = pd.DataFrame(prof_schedule_display, columns=jours, index=heures)
-                config = {jour: st.column_config.TextColumn(width="small") for jour in jours} # smaller width
-                st.dataframe(df, column_config=config, width="stretch")
+            st.error(f"Explication impossible: {e}")
         else:
-            st.warning("Variables profs incomplètes pour plannings.")
-
-        # Salles
-        if hasattr(solution, "planning_salle") and heures:
-            st.header("Occupation Salles")
-            salles_list_display = [s for s in salles_enum_list if s != "Empty"]
-            room_schedules = {salle: [["" for _ in jours] for _ in range(nombre_heures)] for salle in salles_list_display}
-            planning_salle_data = solution.planning_salle
-            num_classes_sol = len(planning_salle_data)
-            num_jours = len(jours)
-            for c in range(num_classes_sol):
-                for d in range(nombre_heures):
-                    for w in range(num_jours):
-                         if c<len(planning_salle_data) and d<len(planning_salle_data[c]) and w<len(planning_salle_data[c][d]):
-                            salle_obj = planning_salle_data[c][d][w]
-                            if salle_obj is not None:
-                                salle_name = str(salle_obj)
-                                if salle_name != "Empty" and salle_name in room_schedules:
-                                    room_schedules[salle_name][d][w] = f"Classe {c+1}"
-            for salle_name, schedule_data in room_schedules.items():
-                st.subheader(f"Salle: {salle_name}")
-                df = pd.DataFrame(schedule_data, columns=jours, index=heures)
-                config = {jour: st.column_config.TextColumn(width="small") for jour in jours} # smaller width
-                st.dataframe(df, column_config=config, width="stretch")
+            if groupes:
+                st.write("Ces groupes de contraintes sont incompatibles entre eux :")
+                for g in groupes:
+                    st.markdown(f"- **{g['groupe']}** (lignes {', '.join(map(str, g['lignes']))})")
+            else:
+                st.info("Aucun ensemble incompatible trouvé dans le temps imparti.")
+
+with st.expander("Diagnostics du modèle et historique des résolutions"):
+    if st.button("Analyser le modèle aplati", key="flat_profile"):
+        try:
+            solver, _ = get_solver()
+            model_path = engine.MODELS[model_choice]
+            config = engine.normalize_config(config_data_to_save)
+            with st.spinner("Aplatissement du modèle..."):
+                profil = diagnostics.flat_profile(engine.build_instance(solver, config, model_path,
+                                                                        constraints=contraintes_ajoutees(config)),
+                                                  engine.model_text(model_path))
+        except Exception as e:
+            st.error(f"Échec de l'aplatissement: {e}")
         else:
-            st.warning("Variable 'planning_salle' non trouvée.")
-
-    elif result and result.status == minizinc.Status.UNSATISFIABLE:
-        st.error(f"UNSAT avec ces paramètres. Statut: {result.status}")
-    elif result:
-        st.error(f"Pas de solution retournée. Statut: {result.status}")
-    else:
-        st.error("Résolution échouée ou aucun résultat, peut-être que les contraintes sont trop strictes (réessayez en augmentant le timeout ou en assouplissant les contraintes).")
-elif 'minizinc_result' not in st.session_state or st.session_state.minizinc_result is None:
-    if not st.session_state.get("solve_error", False):
-         st.info("Configurez les paramètres et lancez la résolution.")
\ No newline at end of file
+            st.caption(f"Aplatissement en {profil['flatten_time']:.2f}s : {profil['variables']} variables, "
+                       f"{profil['constraints']} contraintes FlatZinc.")
+            st.write("**Contraintes par groupe du modèle**")
+            st.dataframe(pd.Series(profil["groups"], name="Contraintes"), use_container_width=True)
+            st.write("**Contraintes par prédicat**")
+            st.dataframe(pd.Series(profil["predicates"], name="Contraintes"), use_container_width=True)
+    historique = diagnostics.read_log(limit=20)
+    if historique:
+        colonnes = ["time", "mode", "model", "solver", "classes", "status", "objective", "elapsed",
+                    "flatten_time", "first_solution", "variables", "constraints", "conflicts", "branches", "gap"]
+        st.dataframe(pd.DataFrame(historique[::-1]).reindex(columns=colonnes), hide_index=True)
@@ -0,0 +1,143 @@
+"""Banc d'essai : résout des instances générées et compare à une référence.
+
+Chaque cas (instance × modèle × solveur × mode) est résolu dans un processus
+neuf, l'un après l'autre, pour que les temps et la mémoire ne se mélangent
+pas. Le rapport JSON contient, par cas : statut, objectif, temps
+d'aplatissement, temps jusqu'à la première solution, courbe objectif/temps,
+écart final à la borne du solveur et pic mémoire des processus du solveur.
+
+Exemples :
+    python benchmark.py --seeds 2 --timeout 60 -o bench.json
+    python benchmark.py --models complet allege --baseline bench.json -o bench_new.json
+"""
+import argparse
+import json
+import platform
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import engine
+from instances import FAMILIES, benchmark_instances
+
+# Tolérances de la comparaison à la référence
+TIME_TOLERANCE = 1.5  # première solution jusqu'à 1,5 fois plus lente
+TIME_SLACK = 1.0  # secondes ignorées (bruit sur les instances faciles)
+
+
+def gap(result):
+    """Écart relatif entre l'objectif et la borne prouvée (0 si optimal, None si inconnu)."""
+    if result["status"] == "OPTIMAL_SOLUTION":
+        return 0.0
+    bound = (result.get("statistics") or {}).get("objectiveBound")
+    if result.get("objective") is None or bound is None:
+        return None
+    return abs(result["objective"] - bound) / max(1, abs(result["objective"]))
+
+
+def _run_case(config, solver, model, mode, timeout, threads):
+    # Exécuté dans un processus neuf : ru_maxrss des enfants = pic du solveur de ce cas
+    try:
+        result = engine.solve_config(config, solver, engine.MODELS.get(model, model), timeout, threads, mode=mode)
+    except Exception as e:
+        result = {"status": "ERROR", "error": f"{type(e).__name__}: {e}", "objective": None, "timeline": []}
+    peak_kb = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    timeline = result.get("timeline") or []
+    return {
+        "status": result["status"],
+        "objective": result.get("objective"),
+        "elapsed": result.get("elapsed"),
+        "flatten_time": result.get("flatten_time"),
+        "first_solution": timeline[0][0] if timeline else None,
+        "timeline": timeline,
+        "gap": gap(result) if result["status"] != "ERROR" else None,
+        "peak_memory_mb": round(peak_kb / 1024, 1),
+        "error": result.get("error"),
+    }
+
+
+def run(instances, models, solvers, modes, timeout, threads):
+    """Liste des cas mesurés (un dictionnaire par instance × modèle × solveur × mode)."""
+    cases = []
+    for name, config in instances:
+        for model in models:
+            for solver in solvers:
+                for mode in modes:
+                    with ProcessPoolExecutor(max_workers=1) as pool:
+                        case = pool.submit(_run_case, config, solver, model, mode, timeout, threads).result()
+                    case = dict(instance=name, model=model, solver=solver, mode=mode, **case)
+                    print(f"{name} {model} {solver} {mode}: {case['status']} objectif={case['objective']} "
+                          f"1re solution={case['first_solution']}s aplatissement={case['flatten_time']}s "
+                          f"mémoire={case['peak_memory_mb']}Mo", flush=True)
+                    cases.append(case)
+    return cases
+
+
+def case_key(case):
+    return case["instance"], case["model"], case["solver"], case["mode"]
+
+
+def compare(cases, baseline):
+    """Régressions par rapport au rapport `baseline` (liste de messages)."""
+    reference = {case_key(c): c for c in baseline["cases"]}
+    regressions = []
+    for case in cases:
+        ref = reference.get(case_key(case))
+        if ref is None:
+            continue
+        label = " ".join(case_key(case))
+        if ref["objective"] is not None and case["objective"] is None:
+            regressions.append(f"{label}: plus de solution ({case['status']}, référence {ref['status']})")
+            continue
+        if ref["status"] == "OPTIMAL_SOLUTION" and case["status"] != "OPTIMAL_SOLUTION":
+            regressions.append(f"{label}: optimalité non prouvée ({case['status']})")
+        if ref["objective"] is not None and case["objective"] > ref["objective"]:
+            regressions.append(f"{label}: objectif {case['objective']} > {ref['objective']}")
+        if ref["first_solution"] is not None and case["first_solution"] is not None \
+                and case["first_solution"] > ref["first_solution"] * TIME_TOLERANCE + TIME_SLACK:
+            regressions.append(f"{label}: première solution en {case['first_solution']}s "
+                               f"au lieu de {ref['first_solution']}s")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Banc d'essai des modèles et solveurs")
+    parser.add_argument("--seeds", type=int, default=1, help="instances par famille (défaut: %(default)s)")
+    parser.add_argument("--families", nargs="+", choices=sorted(FAMILIES), default=None,
+                        help="familles d'instances (défaut: toutes)")
+    parser.add_argument("--models", nargs="+", default=["complet"],
+                        help=f"modèles : {', '.join(engine.MODELS)} ou chemins .mzn (défaut: %(default)s)")
+    parser.add_argument("--solvers", nargs="+", default=[engine.DEFAULT_SOLVER], help="solveurs (défaut: %(default)s)")
+    parser.add_argument("--modes", nargs="+", choices=sorted(engine.SOLVE_MODES), default=["pondere"],
+                        help="modes d'optimisation (défaut: %(default)s)")
+    parser.add_argument("--timeout", type=float, default=60, help="timeout par cas en secondes (défaut: %(default)s)")
+    parser.add_argument("-t", "--threads", type=int, default=8, help="threads du solveur (défaut: %(default)s)")
+    parser.add_argument("-o", "--output", default="benchmark.json", help="rapport JSON (défaut: %(default)s)")
+    parser.add_argument("--baseline", default=None, help="rapport de référence à comparer")
+    args = parser.parse_args(argv)
+
+    started = time.strftime("%Y-%m-%dT%H:%M:%S")
+    cases = run(benchmark_instances(args.seeds, args.families), args.models, args.solvers, args.modes,
+                args.timeout, args.threads)
+    report = {
+        "meta": {"date": started, "timeout": args.timeout, "threads": args.threads, "seeds": args.seeds,
+                 "machine": platform.node(), "python": platform.python_version()},
+        "cases": cases,
+    }
+    Path(args.output).write_text(json.dumps(report, indent=2))
+    print(f"Rapport écrit dans {args.output}")
+
+    if args.baseline:
+        regressions = compare(cases, json.loads(Path(args.baseline).read_text()))
+        for message in regressions:
+            print(f"RÉGRESSION {message}", file=sys.stderr)
+        if regressions:
+            return 1
+        print("Aucune régression par rapport à la référence.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+"""Cache disque des résultats de résolution, adressé par contenu.
+
+La clé est un hash de la configuration normalisée (hors timeout), du texte du
+modèle et de l'identifiant du solveur. Le timeout est enregistré avec le
+résultat : un résultat définitif (optimal ou UNSAT) est toujours réutilisable,
+un résultat non optimal seulement pour une demande dont le timeout n'est pas
+plus long que celui qui l'a produit.
+"""
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+
+DEFAULT_CACHE_DIR = Path(os.environ.get("PLANNING_CACHE_DIR", Path(tempfile.gettempdir()) / "planning_cache"))
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+FINAL_STATUSES = {"OPTIMAL_SOLUTION", "UNSATISFIABLE", "ALL_SOLUTIONS"}
+
+
+def cache_key(config, model_text, solver_id):
+    payload = {k: v for k, v in config.items() if k != "timeout"}
+    h = hashlib.sha256()
+    h.update(json.dumps(payload, sort_keys=True, separators=(",", ":")).encode())
+    h.update(b"\0" + model_text.encode())
+    h.update(b"\0" + str(solver_id).encode())
+    return h.hexdigest()
+
+
+class ResultCache:
+    """Un fichier JSON par entrée ; éviction LRU (date de dernier accès) au-delà de `max_bytes`."""
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key):
+        return self.directory / f"{key}.json"
+
+    def get(self, key, timeout):
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if entry["result"]["status"] not in FINAL_STATUSES and timeout > entry["timeout"]:
+            return None
+        try:
+            os.utime(path)  # marque l'entrée comme récemment utilisée
+        except FileNotFoundError:
+            pass
+        return entry["result"]
+
+    def put(self, key, timeout, result):
+        if result.get("status") == "ERROR":
+            return
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump({"timeout": timeout, "result": result}, f)
+        os.replace(tmp, self._path(key))
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for p in self.directory.glob("*.json"):
+            try:
+                st = p.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, p))
+        total = sum(size for _, size, _ in entries)
+        for _, size, p in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                p.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        for p in self.directory.glob("*.json"):
+            p.unlink(missing_ok=True)
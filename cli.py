@@ -0,0 +1,116 @@
+"""Résolution en ligne de commande des configurations sauvegardées par l'app.
+
+Exemples :
+    python cli.py config_planning.json
+    python cli.py configs/ --jobs 4 --threads 2 --timeout 120 -o resultats/
+"""
+import argparse
+import json
+import logging
+import sys
+from pathlib import Path
+
+import minizinc
+
+import diagnostics
+import engine
+import export
+import feasibility
+import views
+import symmetry
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Solveur d'emplois du temps (sans interface)")
+    parser.add_argument("inputs", nargs="+", help="fichiers .json ou répertoires de configurations")
+    parser.add_argument("-o", "--output-dir", default="resultats", help="répertoire des résultats (défaut: %(default)s)")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="nombre de résolutions simultanées")
+    parser.add_argument("-t", "--threads", type=int, default=1, help="threads du solveur par résolution (défaut: %(default)s)")
+    parser.add_argument("--timeout", type=float, default=None, help="timeout par résolution en secondes (défaut: celui de la config)")
+    parser.add_argument("--solver", default=engine.DEFAULT_SOLVER, help="identifiant du solveur MiniZinc (défaut: %(default)s)")
+    parser.add_argument("--model", default="complet",
+                        help=f"modèle MiniZinc : {' ou '.join(engine.MODELS)} ou chemin d'un .mzn (défaut: %(default)s)")
+    parser.add_argument("--mode", choices=sorted(engine.SOLVE_MODES), default="pondere",
+                        help="pondere : objectif pondéré unique ; lexicographique : un critère par étape ; "
+                             "lns : grand voisinage, pour les grosses instances ; "
+                             "portefeuille : plusieurs solveurs en course, threads répartis ; "
+                             "deux_phases : salles affectées après la résolution ; "
+                             "groupes : groupes de classes (clé groupes_classes de la config, sinon automatiques) "
+                             "résolus en parallèle puis réunis (défaut: %(default)s)")
+    parser.add_argument("--symetries", action="store_true",
+                        help="ajoute le bris de symétrie (profs, classes et salles interchangeables)")
+    parser.add_argument("--expliquer", action="store_true",
+                        help="pour chaque configuration insatisfiable, cherche les groupes de contraintes en conflit (findMUS)")
+    parser.add_argument("--export", action="store_true",
+                        help="écrit aussi <nom>.zip : tableaux NPZ, cours en Parquet/CSV, CSV et ICS par classe, prof et salle")
+    parser.add_argument("--cache-dir", default=None, help="répertoire du cache de résultats (désactivé par défaut)")
+    parser.add_argument("--fzn-cache-dir", default=None,
+                        help="répertoire du cache des modèles FlatZinc compilés (désactivé par défaut)")
+    parser.add_argument("--warm-start-dir", default=None,
+                        help="répertoire de résultats précédents : chaque config repart de sa solution <nom>.result.json")
+    parser.add_argument("--stats-log", default=None,
+                        help="journal JSON lines des statistiques de résolution (défaut: $PLANNING_STATS_LOG ou cache)")
+    parser.add_argument("--metrics-file", default=diagnostics.METRICS_FILE,
+                        help="fichier de métriques au format texte Prometheus (défaut: $PLANNING_METRICS_FILE)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="affiche la progression (itérations LNS...)")
+    parser.add_argument("--minizinc", default=None, help="chemin de l'exécutable minizinc (défaut: celui du PATH)")
+    return parser.parse_args(argv)
+
+
+def explain(name, config, args):
+    """Affiche les groupes de contraintes d'un sous-ensemble minimal insatisfiable."""
+    if args.minizinc:
+        minizinc.Driver(Path(args.minizinc)).make_default()
+    config = engine.normalize_config(config)
+    extra = symmetry.symmetry_constraints(config) if args.symetries else []
+    try:
+        groupes = feasibility.explain_unsat(config, engine.MODELS.get(args.model, args.model),
+                                            extra + feasibility.bound_constraints(config))
+    except Exception as e:
+        print(f"{name}: explication impossible ({type(e).__name__}: {e})", file=sys.stderr)
+        return
+    for g in groupes:
+        print(f"  conflit : {g['groupe']} (lignes {', '.join(map(str, g['lignes']))})")
+    if not groupes:
+        print("  aucun ensemble incompatible trouvé dans le temps imparti")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, format="%(asctime)s %(message)s")
+    jobs = engine.load_configs(args.inputs)
+    if not jobs:
+        print("Aucune configuration trouvée.", file=sys.stderr)
+        return 2
+    configs = dict(jobs)
+    out_dir = Path(args.output_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    failures = 0
+    for name, result in engine.solve_batch(
+        jobs, workers=args.jobs, timeout=args.timeout, threads=args.threads,
+        solver_id=args.solver, model_path=engine.MODELS.get(args.model, args.model), minizinc_path=args.minizinc, cache_dir=args.cache_dir,
+        warm_starts=engine.load_previous_solutions(args.warm_start_dir) if args.warm_start_dir else None,
+        mode=args.mode, fzn_cache_dir=args.fzn_cache_dir, symmetries=args.symetries,
+    ):
+        with open(out_dir / f"{name}.result.json", "w") as f:
+            json.dump(result, f, indent=2)
+        if args.export and engine.has_solution(result) and result["solution"].get("planning"):
+            (out_dir / f"{name}.zip").write_bytes(export.export_zip(views.decode_solution(result["solution"])))
+        diagnostics.log_solve(result, {"name": name, "mode": args.mode, "model": args.model, "solver": args.solver},
+                              args.stats_log, args.metrics_file)
+        if result["status"] == "ERROR":
+            failures += 1
+            print(f"{name}: ERREUR {result['error']}", file=sys.stderr)
+        else:
+            source = "cache" if result.get("cached") else f"{result['elapsed']:.1f}s"
+            print(f"{name}: {result['status']} objectif={result['objective']} ({source})")
+            for probleme in result.get("infeasible") or []:
+                print(f"  {probleme['groupe']} : {probleme['message']}")
+            if args.expliquer and result["status"] == "UNSATISFIABLE" and not result.get("infeasible"):
+                explain(name, configs[name], args)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+"""Statistiques de résolution : résumé, journal JSON lines, métriques et profil du modèle aplati.
+
+Chaque résolution terminée (app via jobs.py, CLI) est ajoutée au journal
+PLANNING_STATS_LOG (une ligne JSON par résolution). Si PLANNING_METRICS_FILE
+est défini, ce fichier est réécrit au format texte Prometheus (compteurs par
+statut, durées et tailles de la dernière résolution) pour être collecté.
+"""
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from cache import DEFAULT_CACHE_DIR
+
+DEFAULT_STATS_LOG = Path(os.environ.get("PLANNING_STATS_LOG", DEFAULT_CACHE_DIR / "solves.jsonl"))
+METRICS_FILE = os.environ.get("PLANNING_METRICS_FILE")
+
+# Noms possibles de chaque statistique selon le solveur (MiniZinc, CP-SAT, Gecode, Chuffed)
+STAT_ALIASES = {
+    "solve_time": ("solveTime", "time"),
+    "conflicts": ("conflicts", "failures"),
+    "branches": ("branches", "nodes", "decisions"),
+    "propagations": ("propagations",),
+    "best_bound": ("objectiveBound", "bestBound"),
+    "solutions": ("nSolutions", "solutions"),
+}
+FLAT_VARS = ("flatIntVars", "flatBoolVars", "flatFloatVars", "flatSetVars")
+FLAT_CONSTRAINTS = ("flatIntConstraints", "flatBoolConstraints", "flatFloatConstraints", "flatSetConstraints")
+
+CONSTRAINT_LINE = re.compile(r"^constraint (\w+)\(")
+PATH = re.compile(r'mzn_path\("[^|"]*\|(\d+)\|')
+SECTION = re.compile(r"^%+\s*(.+?)\s*$")
+COMMENTED_CODE = re.compile(r"^(constraint|var|array|solve|output)\b|;")
+
+_lock = threading.Lock()
+_counters = Counter()
+
+
+def summarize(result):
+    """Résumé des statistiques d'un résultat (voir engine.result_to_dict), clés absentes à None."""
+    stats = result.get("statistics") or {}
+    summary = {
+        "status": result.get("status"),
+        "objective": result.get("objective"),
+        "elapsed": result.get("elapsed"),
+        "flatten_time": result.get("flatten_time", stats.get("flatTime")),
+        "first_solution": result["timeline"][0][0] if result.get("timeline") else None,
+        "variables": sum(stats[k] for k in FLAT_VARS if k in stats) if any(k in stats for k in FLAT_VARS) else None,
+        "constraints": sum(stats[k] for k in FLAT_CONSTRAINTS if k in stats)
+        if any(k in stats for k in FLAT_CONSTRAINTS) else None,
+    }
+    for name, aliases in STAT_ALIASES.items():
+        summary[name] = next((stats[k] for k in aliases if k in stats), None)
+    if summary["objective"] is not None and summary["best_bound"] is not None:
+        summary["gap"] = abs(summary["objective"] - summary["best_bound"]) / max(1, abs(summary["objective"]))
+    else:
+        summary["gap"] = 0.0 if result.get("status") == "OPTIMAL_SOLUTION" else None
+    return summary
+
+
+def log_solve(result, context=None, path=None, metrics_file=METRICS_FILE):
+    """Ajoute la résolution au journal JSON lines et met à jour le fichier de métriques."""
+    path = Path(path or DEFAULT_STATS_LOG)
+    entry = {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), **(context or {}), **summarize(result),
+             "cached": bool(result.get("cached")), "timeline": result.get("timeline") or [],
+             "statistics": result.get("statistics") or {}}
+    with _lock:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+        _counters[entry["status"]] += 1
+        if metrics_file:
+            write_metrics(metrics_file, entry)
+    return entry
+
+
+def write_metrics(path, entry):
+    """Réécrit le fichier de métriques (format texte Prometheus) à partir de la dernière résolution."""
+    lines = ["# TYPE planning_solves_total counter"]
+    lines += [f'planning_solves_total{{status="{status}"}} {n}' for status, n in sorted(_counters.items())]
+    for name in ("elapsed", "flatten_time", "solve_time", "first_solution", "objective", "best_bound", "gap",
+                 "variables", "constraints", "conflicts", "branches"):
+        if isinstance(entry.get(name), (int, float)):
+            lines += [f"# TYPE planning_last_{name} gauge", f"planning_last_{name} {entry[name]}"]
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(tmp, path)
+
+
+def _tail(f, limit, block=65536):
+    # Dernières lignes (au moins `limit` non vides) d'un fichier ouvert en binaire, lu par la fin
+    f.seek(0, os.SEEK_END)
+    end = pos = f.tell()
+    data = b""
+    while pos > 0 and data.count(b"\n") <= limit:
+        pos = max(0, pos - block)
+        f.seek(pos)
+        data = f.read(end - pos)
+    lines = data.split(b"\n")
+    if pos > 0:
+        lines = lines[1:]  # première ligne peut-être coupée
+    return [line for line in lines if line.strip()][-limit:]
+
+
+def read_log(path=None, limit=None):
+    """Entrées du journal, les plus récentes en dernier ; avec `limit`, seule la fin du fichier est lue."""
+    path = Path(path or DEFAULT_STATS_LOG)
+    if not path.exists():
+        return []
+    with open(path, "rb") as f:
+        lines = _tail(f, limit) if limit else [line for line in f if line.strip()]
+    return [json.loads(line) for line in lines]
+
+
+def model_sections(text):
+    """Section (dernier commentaire pleine ligne qui précède) de chaque ligne du modèle, indexée à partir de 1."""
+    sections, current = [None], "(début du modèle)"
+    for line in text.splitlines():
+        m = SECTION.match(line)
+        if m and not COMMENTED_CODE.search(m.group(1)):
+            current = m.group(1).strip("- ")
+        sections.append(current)
+    return sections
+
+
+def flat_profile(inst, model_text=None):
+    """Taille du modèle aplati : nombre de contraintes FlatZinc par prédicat et par groupe de contraintes.
+
+    L'instance est aplatie avec --keep-paths ; chaque contrainte FlatZinc est
+    rattachée à la ligne de l'item MiniZinc qui l'a produite, puis à la
+    section du modèle (commentaire qui précède, voir `model_sections`) si
+    `model_text` est fourni. Les lignes au-delà du modèle sont les contraintes
+    ajoutées par le moteur (bornes, bris de symétrie, voisinages LNS).
+    """
+    start = time.perf_counter()
+    with inst.flat(**{"keep-paths": True}) as (fzn, _ozn, _stats):
+        lines = Path(fzn.name).read_text().splitlines()
+    flatten_time = time.perf_counter() - start
+    sections = model_sections(model_text) if model_text else None
+    predicates, groups, variables = Counter(), Counter(), 0
+    for line in lines:
+        if line.startswith("var "):
+            variables += 1
+        m = CONSTRAINT_LINE.match(line)
+        if not m:
+            continue
+        predicates[m.group(1)] += 1
+        p = PATH.search(line)
+        if p is None:
+            groups["(inconnu)"] += 1
+        elif sections is None:
+            groups[f"ligne {p.group(1)}"] += 1
+        else:
+            n = int(p.group(1))
+            groups[sections[n] if n < len(sections) else "(contraintes ajoutées)"] += 1
+    return {"flatten_time": flatten_time, "variables": variables, "constraints": sum(predicates.values()),
+            "predicates": dict(predicates.most_common()), "groups": dict(groups.most_common())}
@@ -0,0 +1,1156 @@
+"""Moteur de résolution sans interface.
+
+Construit l'instance MiniZinc à partir d'une configuration JSON (celle produite
+par « Sauvegarder la Configuration » dans app.py) et la résout, seule ou par
+lots dans un pool de processus.
+"""
+import asyncio
+import datetime
+import functools
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import random
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import minizinc
+
+from cache import ResultCache, cache_key
+from flatzinc import FlatZincCache, instance_key, iter_flatzinc
+import feasibility
+import rooms
+import sharding
+import symmetry
+
+MODEL_PATH = Path(__file__).resolve().parent / "planning.mzn"
+LEAN_MODEL_PATH = MODEL_PATH.with_name("planning_lean.mzn")
+MODELS = {"complet": MODEL_PATH, "allege": LEAN_MODEL_PATH}
+DEFAULT_SOLVER = "cp-sat"
+NB_JOURS = 5
+
+MATIERES = [
+    "EnseignementScientifique", "Anglais", "Espagnol", "Mathematiques",
+    "HistoireGeographie", "Physique", "EPS", "Philosophie", "Option"
+]
+SALLES = ["S101", "S102", "S201", "S202", "S203", "S204", "Gymnase", "Stade",
+          "LaboPhysique1", "LaboPhysique2", "LaboChimie", "Empty"]
+DEFAULT_CAPACITES = [35, 35, 31, 30, 32, 29, 60, 100, 32, 32, 34, 0]
+DEFAULT_HEURES_COURS = [2, 2, 2, 6, 2, 6, 2, 2, 3, 0]  # dernier = Void
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG = {
+    "nombre_heures_jour": 10,
+    "nombre_profs": 11,
+    "num_classes": 3,
+    "timeout": 5,
+}
+
+
+def normalize_config(config):
+    """Complète une configuration (éventuellement partielle) avec les valeurs par défaut de l'app."""
+    cfg = dict(DEFAULT_CONFIG)
+    cfg.update({k: v for k, v in config.items() if v is not None})
+    n_classes = int(cfg["num_classes"])
+    n_profs = int(cfg["nombre_profs"])
+
+    tailles = list(cfg.get("tailles_classes", []))[:n_classes]
+    tailles += [30] * (n_classes - len(tailles))
+    capacites = list(cfg.get("capacites_salles", DEFAULT_CAPACITES))[:len(SALLES)]
+    capacites += DEFAULT_CAPACITES[len(capacites):]
+    capacites[SALLES.index("Empty")] = 0
+    interdictions = list(cfg.get("interdictions", []))[:n_profs]
+    interdictions += [0] * (n_profs - len(interdictions))
+    affectations = list(cfg.get("affectations_raw", []))[:n_profs]
+    affectations += [0] * (n_profs - len(affectations))
+    heures = list(cfg.get("nombre_heures_cours", DEFAULT_HEURES_COURS))[:len(MATIERES)]
+    heures += DEFAULT_HEURES_COURS[len(heures):len(MATIERES)]
+    heures.append(0)  # Pour 'Void'
+
+    cfg.update({
+        "nombre_heures_jour": int(cfg["nombre_heures_jour"]),
+        "nombre_profs": n_profs,
+        "num_classes": n_classes,
+        "tailles_classes": [int(x) for x in tailles],
+        "capacites_salles": [int(x) for x in capacites],
+        "interdictions": [int(x) for x in interdictions],
+        "affectations_raw": [int(x) for x in affectations],
+        "nombre_heures_cours": [int(x) for x in heures],
+    })
+    return cfg
+
+
+def config_to_data(config):
+    """Traduit une configuration normalisée en paramètres du modèle MiniZinc."""
+    return {
+        "CLASS": range(1, config["num_classes"] + 1),
+        "taille_classe": config["tailles_classes"],
+        "PROFS": range(1, config["nombre_profs"] + 1),
+        "nombre_heures_jour": config["nombre_heures_jour"],
+        "DAY": range(1, config["nombre_heures_jour"] + 1),
+        "WEEK": range(1, NB_JOURS + 1),
+        "capacite_salle": config["capacites_salles"],
+        "interdictions": config["interdictions"],
+        "affectations": [MATIERES[a - 1] if a > 0 else "Void" for a in config["affectations_raw"]],
+        "nombre_heures_cours": config["nombre_heures_cours"],
+    }
+
+
+@functools.cache
+def prepare_ortools_env():
+    # CP-SAT (paquet ortools) a besoin de ses bibliothèques dans LD_LIBRARY_PATH ;
+    # une fois par processus (l'import d'ortools est coûteux)
+    try:
+        import ortools
+        ortools_dir = Path(ortools.__file__).parent
+        lib_paths = [str(p) for p in [ortools_dir, ortools_dir / ".libs"] if p.is_dir()]
+        if lib_paths:
+            ld_path = os.environ.get('LD_LIBRARY_PATH', '')
+            new_ld = ":".join(lib_paths)
+            if ld_path: new_ld = new_ld + ":" + ld_path
+            os.environ['LD_LIBRARY_PATH'] = new_ld
+    except Exception: pass
+
+
+@functools.lru_cache(maxsize=None)
+def _lookup_solver(solver_id, driver):
+    return minizinc.Solver.lookup(solver_id, driver)
+
+
+def lookup_solver(solver):
+    # Solver.lookup lance `minizinc --solvers-json` : mémorisé par identifiant et driver
+    if isinstance(solver, minizinc.Solver):
+        return solver
+    return _lookup_solver(solver or DEFAULT_SOLVER, minizinc.default_driver)
+
+
+@functools.lru_cache(maxsize=32)
+def _read_model(path, mtime_ns):
+    return Path(path).read_text()
+
+
+def model_text(model_path=MODEL_PATH):
+    """Texte du modèle, relu seulement si le fichier a changé."""
+    path = Path(model_path).resolve()
+    return _read_model(str(path), path.stat().st_mtime_ns)
+
+
+SOLVE_ITEM = re.compile(r"^\s*solve\b[^;]*;", re.M)
+OUTPUT_ITEM = re.compile(r"^\s*output\b", re.M)
+ROOM_BLOCK = re.compile(r"^% --- Salles ---$.*?^% --- Fin des salles ---$", re.M | re.S)
+NO_ROOMS = "constraint forall(c in CLASS, d in DAY, w in WEEK) (planning_salle[c, d, w] = Empty);"
+
+
+def without_rooms(text):
+    """Texte du modèle sans la couche salles (bloc « Salles »), planning_salle fixé à Empty."""
+    text, n = ROOM_BLOCK.subn(NO_ROOMS, text, count=1)
+    if n != 1:
+        raise ValueError("Bloc « % --- Salles --- » ... « % --- Fin des salles --- » introuvable dans le modèle")
+    return text
+
+
+def load_model(model_path=MODEL_PATH, annotations=(), objective=None, constraints=(), with_rooms=True,
+               outputs=()):
+    """Charge le modèle, éventuellement modifié.
+
+    `annotations` sont ajoutées à l'item solve, `objective` = (sens, expression)
+    remplace l'objectif (par défaut ("minimize", "obj")) et `constraints` sont
+    des items MiniZinc ajoutés au modèle. `with_rooms=False` retire la couche
+    salles (voir `without_rooms`). Les variables nommées dans `outputs` sont
+    ajoutées à l'item output, seules variables qu'affiche un FlatZinc lancé
+    directement (voir flatzinc.py).
+    """
+    text = model_text(model_path)
+    if not with_rooms:
+        text = without_rooms(text)
+    if annotations or objective is not None:
+        sense, expr = objective or ("minimize", "obj")
+        solve = "solve " + "".join(f":: {a} " for a in annotations) + f"{sense} {expr};"
+        text, n = SOLVE_ITEM.subn(solve, text, count=1)
+        if n != 1:
+            raise ValueError(f"Item solve introuvable dans {model_path}")
+    if outputs:
+        shown = " ++ ".join(f'"{name} = \\({name})\\n"' for name in outputs)
+        text, n = OUTPUT_ITEM.subn(lambda m: f"{m.group(0)} [{shown}] ++", text, count=1)
+        if n != 1:
+            raise ValueError(f"Item output introuvable dans {model_path}")
+    model = minizinc.Model()
+    model.add_string(text + "\n" + "\n".join(constraints))
+    return model
+
+
+def build_instance(solver, config, model_path=MODEL_PATH, annotations=(), objective=None, constraints=(),
+                   with_rooms=True, outputs=()):
+    model = load_model(model_path, annotations, objective, constraints, with_rooms, outputs)
+    inst = minizinc.Instance(lookup_solver(solver), model)
+    for name, value in config_to_data(config).items():
+        inst[name] = value
+    return inst
+
+
+def _warm_start(expr, dims, values):
+    # expr : expression MiniZinc sur les indices i0, i1, ... (parcourus en ordre ligne)
+    if not values:
+        return None
+    ranges = ", ".join(f"i{k} in 1..{n}" for k, n in enumerate(dims))
+    return f"warm_start([{expr} | {ranges}], [{', '.join(map(str, values))}])"
+
+
+def warm_start_annotation(previous, config):
+    """Annotation `warm_start_array` qui propose une solution précédente comme point de départ.
+
+    Seule la partie commune aux deux dimensions (classes, heures, professeurs)
+    est proposée, ce qui permet de repartir d'une solution calculée avec moins
+    ou plus de classes/professeurs. Les valeurs inconnues sont ignorées.
+    """
+    matieres = MATIERES + ["Void"]
+    planning = previous.get("planning") or []
+    planning_salle = previous.get("planning_salle") or []
+    prefs = previous.get("prefs") or []
+    prof_to_class = previous.get("prof_to_class") or []
+
+    n_c = min(config["num_classes"], len(planning), len(planning_salle))
+    n_d = min([config["nombre_heures_jour"]] + [len(row) for row in planning[:n_c]])
+    n_p = min(config["nombre_profs"], len(prefs), len(prof_to_class))
+
+    def cells(data, names):
+        vals = [data[c][d][w] for c in range(n_c) for d in range(n_d) for w in range(NB_JOURS)]
+        return [names.index(v) + 1 for v in vals] if all(v in names for v in vals) else []
+
+    hints = [
+        _warm_start("enum2int(planning[i0, i1, i2])", (n_c, n_d, NB_JOURS), cells(planning, matieres)),
+        _warm_start("enum2int(planning_salle[i0, i1, i2])", (n_c, n_d, NB_JOURS), cells(planning_salle, SALLES)),
+        _warm_start("prefs[i0, to_enum(MATIERES, i1)]", (n_p, len(matieres)), [v for row in prefs[:n_p] for v in row[:len(matieres)]]
+                    if all(len(row) >= len(matieres) for row in prefs[:n_p]) else []),
+        _warm_start("prof_to_class[i0, i1]", (n_p, n_c), [v for row in prof_to_class[:n_p] for v in row[:n_c]]),
+    ]
+    hints = [h for h in hints if h]
+    if not hints:
+        return None
+    return "warm_start_array([" + ", ".join(hints) + "])"
+
+
+def _plain(value):
+    # Valeurs MiniZinc -> types JSON (les enums arrivent déjà sous forme de str)
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    if isinstance(value, (set, frozenset, range)):
+        return sorted(_plain(v) for v in value)
+    if isinstance(value, datetime.timedelta):
+        return value.total_seconds()
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+
+def solution_to_dict(solution):
+    if solution is None:
+        return None
+    return {k: _plain(v) for k, v in vars(solution).items() if not k.startswith("_")}
+
+
+def result_to_dict(result, elapsed=None):
+    """Résultat MiniZinc -> dictionnaire sérialisable (JSON, pickle entre processus)."""
+    solution = solution_to_dict(result.solution) if result.solution is not None else None
+    return {
+        "status": result.status.name,
+        "objective": _plain(result.objective),
+        "solution": solution,
+        "statistics": {k: _plain(v) for k, v in result.statistics.items()},
+        "elapsed": elapsed,
+    }
+
+
+def has_solution(result):
+    return bool(result) and result.get("solution") is not None
+
+
+def solver_tag(solver):
+    return solver.id if isinstance(solver, minizinc.Solver) else (solver or DEFAULT_SOLVER)
+
+
+def _iter_instance(inst, timeout, processes, heartbeat=None, random_seed=None):
+    # Boucle commune : pilote inst.solutions() de façon synchrone (voir iter_solutions)
+    prepare_ortools_env()
+    loop = asyncio.new_event_loop()
+    solutions = inst.solutions(
+        processes=processes,
+        random_seed=random_seed,
+        time_limit=datetime.timedelta(seconds=timeout),
+        intermediate_solutions=True,
+    )
+    start = time.perf_counter()
+    best, timeline, last = None, [], None
+    pending, finished = None, False
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(solutions.__anext__(), loop=loop)
+            done, _ = loop.run_until_complete(asyncio.wait({pending}, timeout=heartbeat))
+            if not done:
+                yield None
+                continue
+            task, pending = pending, None
+            try:
+                last = task.result()
+            except StopAsyncIteration:
+                finished = True
+                break
+            if last.solution is not None:
+                elapsed = time.perf_counter() - start
+                best = result_to_dict(last, elapsed)
+                timeline.append((round(elapsed, 3), best["objective"]))
+                best.update(timeline=list(timeline), final=False)
+                yield best
+    finally:
+        # minizinc-python ne tue le processus que sur CancelledError
+        if not finished:
+            if pending is not None:
+                pending.cancel()
+                loop.run_until_complete(asyncio.wait({pending}))
+            try:
+                loop.run_until_complete(solutions.athrow(asyncio.CancelledError()))
+            except (asyncio.CancelledError, StopAsyncIteration):
+                pass
+        loop.close()
+
+    # Le dernier élément de `solutions` ne porte que le statut et les statistiques
+    if last is not None:
+        final = result_to_dict(last, time.perf_counter() - start)
+    else:
+        final = {"status": "UNKNOWN", "objective": None, "solution": None, "statistics": {},
+                 "elapsed": time.perf_counter() - start}
+    if best is not None:
+        final = dict(best, status=final["status"], elapsed=final["elapsed"],
+                     statistics={**best["statistics"], **final["statistics"]})
+    final.update(timeline=timeline, final=True, flatten_time=final["statistics"].get("flatTime"))
+    yield final
+
+
+# Variables de type enum, pour décoder la sortie brute d'un FlatZinc
+FZN_ENUMS = {"planning": MATIERES + ["Void"], "planning_salle": SALLES}
+
+
+def _run_instance(inst, solver, timeout, processes, heartbeat=None, flat_cache=None):
+    # Sans cache FlatZinc : minizinc-python aplatit puis résout. Avec : le .fzn
+    # compilé est réutilisé et le temps d'aplatissement est mesuré à part. Les
+    # appelants ne passent pas le cache quand l'instance porte un démarrage à
+    # chaud : l'indication, compilée dans le .fzn, change à chaque résolution.
+    if flat_cache is None:
+        yield from _iter_instance(inst, timeout, processes, heartbeat)
+        return
+    solver = lookup_solver(solver)
+    key = instance_key(inst, solver.id)
+    hit = flat_cache.get(key)
+    if hit is not None:
+        fzn, stats = hit
+        flatten_time = 0.0
+    else:
+        fzn, stats = flat_cache.compile(inst, key)
+        flatten_time = stats["flatten_time"]
+    stats = dict(stats, flatzinc_cache="hit" if hit else "miss")
+    prepare_ortools_env()
+    for res in iter_flatzinc(fzn, solver, max(1.0, timeout - flatten_time), processes, heartbeat, FZN_ENUMS, stats):
+        if res is not None:
+            res["flatten_time"] = flatten_time
+        yield res
+
+
+def _prepare(config, symmetries):
+    """Pré-vérification et contraintes ajoutées au modèle.
+
+    Renvoie (résultat, None) si `feasibility.check` prouve l'infaisabilité :
+    un résultat final UNSATISFIABLE portant "infeasible" (problèmes
+    détectés), sans lancer le solveur. Sinon (None, contraintes) : borne
+    inférieure du nombre de profs et, si `symmetries`, bris de symétrie.
+    """
+    report = feasibility.check(config)
+    if report["problems"]:
+        return {"status": "UNSATISFIABLE", "objective": None, "solution": None, "statistics": {}, "elapsed": 0.0,
+                "timeline": [], "final": True, "infeasible": report["problems"]}, None
+    constraints = symmetry.symmetry_constraints(config) if symmetries else []
+    return None, constraints + feasibility.bound_constraints(config, report)
+
+
+def iter_solutions(config, solver=DEFAULT_SOLVER, model_path=MODEL_PATH, timeout=None, processes=8, cache=None,
+                   heartbeat=None, warm_start=None, flat_cache=None, symmetries=False):
+    """Résout une configuration en produisant chaque solution améliorante.
+
+    Chaque élément produit est un résultat (voir `result_to_dict`) portant la
+    meilleure solution courante, avec "final": False et la courbe
+    "timeline" [(secondes, objectif), ...]. Le dernier élément a "final": True et
+    le statut définitif. Fermer le générateur avant la fin arrête le solveur.
+    Avec `heartbeat` (secondes), `None` est produit à chaque période sans
+    nouvelle solution, pour rendre la main à l'appelant (p. ex. Streamlit).
+    `warm_start` (la solution d'un résultat précédent) est proposé au solveur
+    comme point de départ (voir `warm_start_annotation`). `flat_cache` (un
+    flatzinc.FlatZincCache) évite de ré-aplatir une instance déjà compilée.
+    `symmetries` ajoute les contraintes de bris de symétrie de `symmetry`.
+    Une configuration que `feasibility.check` montre infaisable donne
+    directement un résultat UNSATISFIABLE portant "infeasible" (voir `_prepare`).
+
+    Si `cache` (un cache.ResultCache) est fourni, un résultat réutilisable pour
+    la même configuration, le même modèle et le même solveur est produit
+    directement (avec "cached": True).
+    """
+    config = normalize_config(config)
+    if timeout is None:
+        timeout = config["timeout"]
+    infeasible, constraints = _prepare(config, symmetries)
+    if infeasible is not None:
+        yield infeasible
+        return
+    if cache is not None:
+        key = cache_key(config, "\n".join([model_text(model_path)] + constraints), solver_tag(solver))
+        hit = cache.get(key, timeout)
+        if hit is not None:
+            yield dict(hit, cached=True, final=True)
+            return
+    hint = warm_start_annotation(warm_start, config) if warm_start else None
+    inst = build_instance(solver, config, model_path, [hint] if hint else [], constraints=constraints)
+    for res in _run_instance(inst, solver, timeout, processes, heartbeat, flat_cache if hint is None else None):
+        if res is not None and res["final"] and cache is not None:
+            cache.put(key, timeout, res)
+        yield res
+
+
+# Ordre de priorité des critères de `obj` dans planning.mzn
+LEXICOGRAPHIC_STAGES = [
+    ("minimize", "obj_prof_used"),
+    ("minimize", "obj_trous_compacts"),
+    ("maximize", "count_start_after_8am"),
+    ("minimize", "obj_trous_profs"),
+    ("minimize", "obj_equilibrage_profs"),
+    ("minimize", "obj_eps_late"),
+    ("minimize", "obj_makespan"),
+]
+LEXICOGRAPHIC_MIN_STAGE = 2.0  # secondes au moins par étape, quitte à ne pas atteindre les dernières
+
+
+# Copie de l'objectif pondéré `obj` en variable de sortie (aussi ajoutée à l'item output pour les
+# FlatZinc en cache) : les étapes lexicographiques ont un autre objectif
+WEIGHTED_OUTPUT = "var int: obj_pondere;\nconstraint obj_pondere = obj;"
+
+
+def _weighted(res):
+    # Résultat d'une étape, avec l'objectif pondéré à la place de la valeur du critère de l'étape
+    solution = dict(res["solution"])
+    obj = solution.pop("obj_pondere", None)
+    if "objective" in solution:
+        solution["objective"] = obj
+    return dict(res, objective=obj, solution=solution)
+
+
+def iter_lexicographic(config, solver=DEFAULT_SOLVER, model_path=MODEL_PATH, timeout=None, processes=8, cache=None,
+                       heartbeat=None, warm_start=None, flat_cache=None, symmetries=False,
+                       stages=LEXICOGRAPHIC_STAGES):
+    """Optimisation lexicographique : un critère par étape au lieu de la somme pondérée `obj`.
+
+    Chaque étape optimise un critère en fixant (par une borne) la valeur
+    obtenue pour les critères précédents, et repart de la solution de l'étape
+    précédente. Le temps restant est partagé à parts égales entre les étapes
+    restantes, avec au moins LEXICOGRAPHIC_MIN_STAGE secondes par étape, si
+    bien qu'une étape terminée tôt laisse son temps aux suivantes. Même
+    protocole que `iter_solutions` ; "objective" et la chronologie donnent
+    l'objectif pondéré `obj`, comme les autres modes, et les résultats portent
+    en plus "stage" (critère en cours) et "stages" (valeurs des critères des
+    étapes terminées).
+    """
+    config = normalize_config(config)
+    if timeout is None:
+        timeout = config["timeout"]
+    infeasible, constraints = _prepare(config, symmetries)
+    if infeasible is not None:
+        yield infeasible
+        return
+    if cache is not None:
+        text = "\n".join([model_text(model_path)] + constraints
+                         + [WEIGHTED_OUTPUT, "% lexicographique " + json.dumps(stages)])
+        key = cache_key(config, text, solver_tag(solver))
+        hit = cache.get(key, timeout)
+        if hit is not None:
+            yield dict(hit, cached=True, final=True)
+            return
+
+    start = time.perf_counter()
+    deadline = start + timeout
+    best, done, bounds, timeline = None, [], [], []
+    for i, (sense, expr) in enumerate(stages):
+        remaining = deadline - time.perf_counter()
+        if remaining < 1:
+            break
+        previous = best["solution"] if best else warm_start
+        hint = warm_start_annotation(previous, config) if previous else None
+        inst = build_instance(solver, config, model_path, [hint] if hint else [], (sense, expr),
+                              constraints + bounds + [WEIGHTED_OUTPUT], outputs=["obj_pondere"])
+        stage = None
+        budget = min(remaining, max(LEXICOGRAPHIC_MIN_STAGE, remaining / (len(stages) - i)))
+        for res in _run_instance(inst, solver, budget, processes, heartbeat,
+                                 flat_cache if hint is None else None):
+            if res is None:
+                yield None
+            elif not res["final"]:
+                res = _weighted(res)
+                timeline.append((round(time.perf_counter() - start, 3), res["objective"]))
+                yield dict(res, stage=expr, stages=list(done), timeline=list(timeline))
+            else:
+                stage = res
+        if stage["solution"] is None:
+            if best is None:
+                # Aucune solution dès la première étape (UNSAT, timeout...)
+                yield dict(stage, stages=done, timeline=timeline, elapsed=time.perf_counter() - start)
+                return
+            break
+        best = _weighted(stage)
+        done.append({"objectif": expr, "sens": sense, "valeur": stage["objective"],
+                     "statut": stage["status"], "temps": round(stage["elapsed"], 3)})
+        bounds.append(f"constraint {expr} {'<=' if sense == 'minimize' else '>='} {stage['objective']};")
+
+    optimal = len(done) == len(stages) and all(s["statut"] == "OPTIMAL_SOLUTION" for s in done)
+    final = dict(best, status="OPTIMAL_SOLUTION" if optimal else "SATISFIED", stages=done, timeline=timeline,
+                 elapsed=time.perf_counter() - start, final=True)
+    final.pop("stage", None)
+    if cache is not None:
+        cache.put(key, timeout, final)
+    yield final
+
+
+LNS_NEIGHBORHOODS = ("classes", "jour", "prof")
+LNS_ITERATION_TIMEOUT = 5.0
+LNS_INITIAL_SHARE = 0.2
+LNS_INITIAL_TICK = 0.5
+
+
+def _lns_free_cells(kind, solution, config, rng, size):
+    # Cellules (c, d, w), indices à partir de 0, libérées par le voisinage `kind`
+    planning = solution["planning"]
+    n_c, n_d = len(planning), config["nombre_heures_jour"]
+    if kind == "jour":
+        w = rng.randrange(NB_JOURS)
+        return {(c, d, w) for c in range(n_c) for d in range(n_d)}
+    if kind == "prof":
+        # Les journées (classe, jour) où un prof utilisé fait cours
+        profs = [p for p, row in enumerate(solution["prof_to_class"]) if any(row)]
+        if profs:
+            p = rng.choice(profs)
+            matieres = {m for m, v in zip(MATIERES, solution["prefs"][p]) if v}
+            days = {(c, w) for c, taught in enumerate(solution["prof_to_class"][p]) if taught
+                    for w in range(NB_JOURS) if any(planning[c][d][w] in matieres for d in range(n_d))}
+            if days:
+                return {(c, d, w) for c, w in days for d in range(n_d)}
+    classes = rng.sample(range(n_c), min(size, n_c))
+    return {(c, d, w) for c in classes for d in range(n_d) for w in range(NB_JOURS)}
+
+
+def _lns_fix_cells(solution, free, with_rooms=True):
+    # Contraintes fixant planning/planning_salle (planning seul si not with_rooms) hors des cellules libérées
+    planning, salles = solution["planning"], solution["planning_salle"]
+    return [f"constraint planning[{c + 1}, {d + 1}, {w + 1}] = {planning[c][d][w]}"
+            + (f" /\\ planning_salle[{c + 1}, {d + 1}, {w + 1}] = {salles[c][d][w]};" if with_rooms else ";")
+            for c in range(len(planning)) for d in range(len(planning[c])) for w in range(NB_JOURS)
+            if (c, d, w) not in free]
+
+
+def iter_lns(config, solver=DEFAULT_SOLVER, model_path=MODEL_PATH, timeout=None, processes=8, cache=None,
+             heartbeat=None, warm_start=None, flat_cache=None, symmetries=False,
+             iteration_timeout=LNS_ITERATION_TIMEOUT, seed=0):
+    """Recherche à grand voisinage (LNS) pour les grosses instances.
+
+    Une première solution est cherchée sur une part (LNS_INITIAL_SHARE) du
+    temps, prolongée jusqu'à la première solution. Ensuite, à chaque
+    itération, un voisinage est libéré (quelques classes, un jour de la
+    semaine ou les journées d'un prof), tout le reste de planning et
+    planning_salle est fixé à la solution courante, et l'instance est résolue
+    en au plus `iteration_timeout` secondes en partant de cette solution. Une
+    solution au moins aussi bonne devient la solution courante. Le choix du
+    voisinage est pondéré par ses succès récents, et le nombre de classes
+    libérées augmente quand le voisinage est résolu à l'optimum sans gain.
+    Même protocole que `iter_solutions` ; les résultats portent en plus
+    "lns" (itérations et succès par voisinage).
+    """
+    config = normalize_config(config)
+    if timeout is None:
+        timeout = config["timeout"]
+    infeasible, constraints = _prepare(config, symmetries)
+    if infeasible is not None:
+        yield infeasible
+        return
+    if cache is not None:
+        text = "\n".join([model_text(model_path)] + constraints + [f"% lns {iteration_timeout} {seed}"])
+        key = cache_key(config, text, solver_tag(solver))
+        hit = cache.get(key, timeout)
+        if hit is not None:
+            yield dict(hit, cached=True, final=True)
+            return
+
+    start = time.perf_counter()
+    deadline = start + timeout
+    hint = warm_start_annotation(warm_start, config) if warm_start else None
+    inst = build_instance(solver, config, model_path, [hint] if hint else [], constraints=constraints)
+    best = None
+    # Battements internes même sans `heartbeat`, pour passer au LNS si le solveur se tait après une solution
+    run = _run_instance(inst, solver, timeout, processes, heartbeat or LNS_INITIAL_TICK,
+                        flat_cache if hint is None else None)
+    try:
+        for res in run:
+            if res is not None:
+                best = res
+                if res["final"]:
+                    break
+                yield res
+            elif heartbeat:
+                yield None
+            if has_solution(best) and time.perf_counter() - start >= timeout * LNS_INITIAL_SHARE:
+                break
+    finally:
+        run.close()
+    if not has_solution(best) or best["final"]:
+        # Pas de solution, ou la résolution complète s'est terminée d'elle-même
+        if cache is not None:
+            cache.put(key, timeout, best)
+        yield dict(best, final=True)
+        return
+
+    rng = random.Random(seed)
+    weights = dict.fromkeys(LNS_NEIGHBORHOODS, 1.0)
+    summary = {"iterations": 0, "voisinages": {k: {"essais": 0, "succes": 0} for k in LNS_NEIGHBORHOODS}}
+    timeline = list(best["timeline"])
+    size = max(1, min(3, config["num_classes"] // 4))
+    n_cells = config["num_classes"] * config["nombre_heures_jour"] * NB_JOURS
+    status = "SATISFIED"
+    while deadline - time.perf_counter() >= 1:
+        kind = rng.choices(LNS_NEIGHBORHOODS, [weights[k] for k in LNS_NEIGHBORHOODS])[0]
+        free = _lns_free_cells(kind, best["solution"], config, rng, size)
+        inst = build_instance(solver, config, model_path, [warm_start_annotation(best["solution"], config)],
+                              constraints=constraints + _lns_fix_cells(best["solution"], free))
+        res = None
+        for res in _iter_instance(inst, min(iteration_timeout, deadline - time.perf_counter()), processes, heartbeat):
+            if res is None:
+                yield None
+        summary["iterations"] += 1
+        summary["voisinages"][kind]["essais"] += 1
+        improved = has_solution(res) and res["objective"] < best["objective"]
+        if has_solution(res) and res["objective"] <= best["objective"]:
+            best = dict(res, elapsed=time.perf_counter() - start)
+        if improved:
+            summary["voisinages"][kind]["succes"] += 1
+            timeline.append((round(time.perf_counter() - start, 3), best["objective"]))
+        weights[kind] = max(0.1, 0.7 * weights[kind] + 0.3 * improved)
+        if res["status"] == "OPTIMAL_SOLUTION" and not improved:
+            if len(free) == n_cells:
+                status = "OPTIMAL_SOLUTION"  # tout était libre : optimum global
+                break
+            size = min(config["num_classes"], size + 1)
+        elif not has_solution(res):
+            size = max(1, size - 1)
+        logger.info("LNS %d (%s, %d cellules libres) : %s %s, meilleur %s", summary["iterations"], kind,
+                    len(free), res["status"], res["objective"], best["objective"])
+        if improved:
+            yield dict(best, timeline=list(timeline), lns=summary, final=False)
+
+    final = dict(best, status=status, elapsed=time.perf_counter() - start, timeline=timeline, lns=summary,
+                 final=True)
+    if cache is not None:
+        cache.put(key, timeout, final)
+    yield final
+
+
+PORTFOLIO_EXTRA_SOLVERS = ("chuffed", "gecode")
+PORTFOLIO_NO_BOUND = 2 ** 62
+PORTFOLIO_RESTART_DELAY = 5.0
+
+
+def portfolio_members(processes=8, solver=DEFAULT_SOLVER, extra_solvers=PORTFOLIO_EXTRA_SOLVERS):
+    """Configurations du portefeuille : (solveur, threads, graine), les cœurs étant répartis entre elles.
+
+    Les solveurs de `extra_solvers` installés reçoivent un cœur chacun, dans
+    la limite des `processes - 1` cœurs laissés par `solver` ; le reste va à
+    `solver`, coupé en deux configurations de graines différentes à partir de
+    4 cœurs. Le total des threads ne dépasse jamais `processes` (au moins 1).
+    """
+    extras = []
+    for extra in extra_solvers:
+        if len(extras) >= processes - 1:
+            break
+        try:
+            if extra != solver:
+                minizinc.Solver.lookup(extra)
+                extras.append((extra, 1, None))
+        except LookupError:
+            pass
+    cores = max(1, processes - len(extras))
+    if cores >= 4:
+        main = [(solver, cores - cores // 2, 0), (solver, cores // 2, 1)]
+    else:
+        main = [(solver, cores, 0)]
+    return main + extras
+
+
+def _member_label(member):
+    solver_id, threads, seed = member
+    label = f"{solver_id} ({threads} thread{'s' if threads > 1 else ''}"
+    return label + (f", graine {seed})" if seed is not None else ")")
+
+
+def _portfolio_member(index, member, config, model_path, deadline, constraints, hint, best, stop, results,
+                      minizinc_path):
+    # Exécuté dans un processus du portefeuille. Chaque solution améliorant la
+    # meilleure valeur partagée `best` est envoyée au parent ; quand un autre
+    # membre a trouvé mieux, la résolution est relancée avec obj < best.
+    try:
+        if minizinc_path:
+            minizinc.Driver(Path(minizinc_path)).make_default()
+        solver_id, threads, seed = member
+        solver = lookup_solver(solver_id)
+        if "-p" not in solver.stdFlags:
+            threads = None
+        if "-r" not in solver.stdFlags:
+            seed = None
+        own = PORTFOLIO_NO_BOUND
+        while True:
+            bound = best.value
+            extra = [f"constraint obj < {bound};"] if bound < PORTFOLIO_NO_BOUND else []
+            inst = build_instance(solver, config, model_path, [hint] if hint else [], constraints=constraints + extra)
+            restarted = time.time()
+            run = _iter_instance(inst, max(1.0, deadline - time.time()), threads, 0.5, seed)
+            final, restart = None, False
+            try:
+                for res in run:
+                    if stop.is_set():
+                        return
+                    if res is None:
+                        restart = best.value < own and time.time() - restarted >= PORTFOLIO_RESTART_DELAY \
+                            and deadline - time.time() > PORTFOLIO_RESTART_DELAY
+                        if restart:
+                            break
+                        continue
+                    if res["final"]:
+                        final = res
+                    elif res["objective"] < own:
+                        own = res["objective"]
+                        with best.get_lock():
+                            improved = own < best.value
+                            if improved:
+                                best.value = own
+                        if improved:
+                            results.put((index, res))
+            finally:
+                run.close()
+            if not restart:
+                results.put((index, dict(final, bound=bound if extra else None)))
+                return
+            hint = None
+    except Exception as e:
+        results.put((index, {"status": "ERROR", "error": f"{type(e).__name__}: {e}", "objective": None,
+                             "solution": None, "final": True}))
+
+
+def iter_portfolio(config, solver=DEFAULT_SOLVER, model_path=MODEL_PATH, timeout=None, processes=8, cache=None,
+                   heartbeat=None, warm_start=None, flat_cache=None, symmetries=False, members=None):
+    """Portefeuille : plusieurs configurations de solveurs en course, chacune dans son processus.
+
+    `members` (par défaut `portfolio_members(processes, solver)`) liste des
+    triplets (solveur, threads, graine). La meilleure valeur de `obj` est
+    partagée entre les processus : un membre dépassé relance sa recherche
+    avec la contrainte obj < meilleure valeur. La course s'arrête dès qu'un
+    membre prouve l'optimalité (ou l'insatisfiabilité), sinon au timeout, et
+    renvoie la meilleure solution. Même protocole que `iter_solutions` ; les
+    résultats portent en plus "member" (membre auteur de la solution) et, à
+    la fin, "portfolio" (bilan par membre). Le cache FlatZinc n'est pas
+    utilisé (les relances changent le modèle).
+    """
+    config = normalize_config(config)
+    if timeout is None:
+        timeout = config["timeout"]
+    infeasible, constraints = _prepare(config, symmetries)
+    if infeasible is not None:
+        yield infeasible
+        return
+    members = members or portfolio_members(processes, solver_tag(solver))
+    if cache is not None:
+        text = "\n".join([model_text(model_path)] + constraints + ["% portefeuille " + json.dumps(members)])
+        key = cache_key(config, text, "portfolio")
+        hit = cache.get(key, timeout)
+        if hit is not None:
+            yield dict(hit, cached=True, final=True)
+            return
+
+    ctx = multiprocessing.get_context("spawn")
+    best_value, stop, results = ctx.Value("q", PORTFOLIO_NO_BOUND), ctx.Event(), ctx.Queue()
+    hint = warm_start_annotation(warm_start, config) if warm_start else None
+    driver = minizinc.default_driver
+    start, deadline = time.perf_counter(), time.time() + timeout
+    procs = [ctx.Process(target=_portfolio_member, daemon=True,
+                         args=(i, member, config, str(model_path), deadline, constraints, hint, best_value, stop,
+                               results, str(driver.executable) if driver else None))
+             for i, member in enumerate(members)]
+    for p in procs:
+        p.start()
+
+    best, timeline, finals, status, proven = None, [], {}, None, None
+    try:
+        while len(finals) < len(procs) and status is None:
+            try:
+                index, res = results.get(timeout=heartbeat or 0.5)
+            except queue.Empty:
+                if time.time() > deadline + 10 or not any(p.is_alive() for p in procs):
+                    break
+                if heartbeat:
+                    yield None
+                continue
+            if has_solution(res) and (best is None or res["objective"] < best["objective"]):
+                elapsed = time.perf_counter() - start
+                best = dict(res, member=_member_label(members[index]), elapsed=elapsed)
+                timeline.append((round(elapsed, 3), best["objective"]))
+                if not res["final"]:
+                    yield dict(best, timeline=list(timeline), final=False)
+            if res["final"]:
+                finals[index] = res
+                if res["status"] == "OPTIMAL_SOLUTION":
+                    status = "OPTIMAL_SOLUTION"
+                elif res["status"] == "UNSATISFIABLE" and res.get("bound") is None:
+                    status = "UNSATISFIABLE"
+                elif res["status"] == "UNSATISFIABLE":
+                    # Rien sous la borne : la solution qui l'a fixée (peut-être pas encore reçue) est optimale
+                    proven = res["bound"] if proven is None else min(proven, res["bound"])
+            if proven is not None and best is not None and best["objective"] <= proven:
+                status = "OPTIMAL_SOLUTION"
+    finally:
+        stop.set()
+        limit = time.time() + 10
+        while any(p.is_alive() for p in procs) and time.time() < limit:
+            try:
+                results.get(timeout=0.1)  # vide la file pour que les membres puissent se terminer
+            except queue.Empty:
+                pass
+        for p in procs:
+            if p.is_alive():
+                p.terminate()
+            p.join()
+
+    errors = [res["error"] for res in finals.values() if res["status"] == "ERROR"]
+    if best is None and errors and len(errors) == len(procs):
+        raise RuntimeError("; ".join(errors))
+    summary = [{"membre": _member_label(member), "statut": finals[i]["status"] if i in finals else "ARRÊTÉ",
+                "objectif": finals[i].get("objective") if i in finals else None}
+               for i, member in enumerate(members)]
+    if best is None:
+        final = {"status": status or "UNKNOWN", "objective": None, "solution": None, "statistics": {}}
+    else:
+        final = dict(best, status=status or "SATISFIED")
+        final.pop("bound", None)
+    final.update(elapsed=time.perf_counter() - start, timeline=timeline, portfolio=summary, final=True)
+    if cache is not None:
+        cache.put(key, timeout, final)
+    yield final
+
+
+TWO_PHASE_MAX_ROUNDS = 20
+
+
+def iter_two_phase(config, solver=DEFAULT_SOLVER, model_path=MODEL_PATH, timeout=None, processes=8, cache=None,
+                   heartbeat=None, warm_start=None, flat_cache=None, symmetries=False, max_rounds=TWO_PHASE_MAX_ROUNDS):
+    """Deux phases : matières et professeurs par le solveur, salles en Python.
+
+    Le modèle est résolu sans sa couche salles, avec des bornes de capacité
+    agrégées par créneau (`rooms.aggregated_constraints`) ; chaque solution
+    reçoit ensuite ses salles (`rooms.assign_rooms`). Une solution sans
+    affectation possible donne une coupe (`rooms.conflict_cut`) et, en fin de
+    tour, le modèle est résolu à nouveau avec les coupes et obj < meilleure
+    valeur, jusqu'à `max_rounds` tours. Les coupes n'écartent que des
+    plannings sans salles possibles : l'optimalité prouvée par le solveur reste
+    valable. Même protocole que `iter_solutions` ; le résultat final porte en
+    plus "deux_phases" (tours, coupes, solutions non départagées).
+    """
+    config = normalize_config(config)
+    if timeout is None:
+        timeout = config["timeout"]
+    infeasible, constraints = _prepare(config, symmetries)
+    if infeasible is not None:
+        yield infeasible
+        return
+    constraints = constraints + rooms.aggregated_constraints(config)
+    if cache is not None:
+        text = "\n".join([without_rooms(model_text(model_path))] + constraints + ["% deux_phases"])
+        key = cache_key(config, text, solver_tag(solver))
+        hit = cache.get(key, timeout)
+        if hit is not None:
+            yield dict(hit, cached=True, final=True)
+            return
+
+    start = time.perf_counter()
+    deadline = start + timeout
+    best, timeline, cuts, rounds, unknown, status, last = None, [], [], 0, 0, None, None
+    while status is None and rounds < max_rounds:
+        remaining = deadline - time.perf_counter()
+        if remaining < 1:
+            break
+        rounds += 1
+        bound = [f"constraint obj < {best['objective']};"] if best else []
+        previous = best["solution"] if best else warm_start
+        hint = warm_start_annotation(previous, config) if previous else None
+        inst = build_instance(solver, config, model_path, [hint] if hint else [], constraints=constraints + cuts + bound,
+                              with_rooms=False)
+        new_cuts = []
+        for res in _run_instance(inst, solver, remaining, processes, heartbeat,
+                                 flat_cache if rounds == 1 and hint is None else None):
+            if res is None:
+                yield None
+                continue
+            last = res
+            if not has_solution(res) or (best is not None and res["objective"] >= best["objective"]):
+                continue
+            outcome, data = rooms.assign_rooms(res["solution"], config)
+            if outcome == "ok":
+                elapsed = time.perf_counter() - start
+                best = dict(res, solution=dict(res["solution"], planning_salle=data), elapsed=elapsed)
+                timeline.append((round(elapsed, 3), best["objective"]))
+                if not res["final"]:
+                    yield dict(best, timeline=list(timeline), final=False)
+            elif outcome == "conflit":
+                cut = rooms.conflict_cut(data)
+                if cut not in cuts and cut not in new_cuts:
+                    new_cuts.append(cut)
+            else:
+                unknown += 1
+        logger.info("deux phases : tour %d, %s, %d coupe(s)", rounds, last["status"], len(new_cuts))
+        if last["status"] == "UNSATISFIABLE":
+            # Rien de mieux que la meilleure solution, sous des coupes qui n'écartent aucune solution complète
+            status = "OPTIMAL_SOLUTION" if best is not None else "UNSATISFIABLE"
+        elif last["status"] == "OPTIMAL_SOLUTION" and best is not None and best["objective"] == last["objective"]:
+            status = "OPTIMAL_SOLUTION"
+        elif not new_cuts:
+            break
+        cuts += new_cuts
+
+    if best is None:
+        final = {"status": status or "UNKNOWN", "objective": None, "solution": None,
+                 "statistics": last["statistics"] if last else {}}
+    else:
+        final = dict(best, status=status or "SATISFIED")
+    final.update(elapsed=time.perf_counter() - start, timeline=timeline, final=True,
+                 deux_phases={"tours": rounds, "coupes": len(cuts), "non_departagees": unknown})
+    if cache is not None:
+        cache.put(key, timeout, final)
+    yield final
+
+
+GROUPS_SHARE = 0.7  # part du temps pour la résolution des groupes, le reste pour la réparation
+
+
+def _group_job(index, config, solver_id, model_path, deadline, threads, constraints, hint, results, minizinc_path):
+    # Exécuté dans un processus du mode groupes : un groupe de classes, sans la couche salles
+    try:
+        if minizinc_path:
+            minizinc.Driver(Path(minizinc_path)).make_default()
+        inst = build_instance(solver_id, config, model_path, [hint] if hint else [], constraints=constraints,
+                              with_rooms=False)
+        final = None
+        for final in _iter_instance(inst, max(1.0, deadline - time.time()), threads):
+            pass
+        results.put((index, final))
+    except Exception as e:
+        results.put((index, {"status": "ERROR", "error": f"{type(e).__name__}: {e}", "objective": None,
+                             "solution": None, "final": True}))
+
+
+def iter_groups(config, solver=DEFAULT_SOLVER, model_path=MODEL_PATH, timeout=None, processes=8, cache=None,
+                heartbeat=None, warm_start=None, flat_cache=None, symmetries=False, share=GROUPS_SHARE):
+    """Groupes de classes résolus en parallèle, puis réunis et réparés.
+
+    Les groupes (voir `sharding.plan` : clé "groupes_classes" de la
+    configuration, sinon formés automatiquement, au plus un par cœur) sont
+    résolus chacun dans son processus, avec leur part des profs et des bornes
+    de capacité des salles, sans la couche salles, pendant une part `share`
+    du temps. Les plannings réunis reçoivent leurs salles
+    (`rooms.assign_rooms`), puis le modèle complet est résolu en fixant les
+    cours des classes réussies (et leurs salles si l'affectation a réussi) :
+    les profs sont choisis pour toute l'école, les classes d'un groupe sans
+    solution ou en conflit de salles sont replanifiées. Le bris de symétrie
+    (`symmetries`) ne s'applique qu'aux groupes. Avec un seul groupe, c'est
+    `iter_solutions`. Même protocole que `iter_solutions` ; les résultats
+    portent en plus "groupes" (bilan par groupe, salles, classes réparées).
+    Le cache FlatZinc n'est pas utilisé.
+    """
+    config = normalize_config(config)
+    if timeout is None:
+        timeout = config["timeout"]
+    infeasible, constraints = _prepare(config, False)
+    if infeasible is not None:
+        yield infeasible
+        return
+    shards = sharding.plan(config, processes)
+    if len(shards) == 1:
+        yield from iter_solutions(config, solver, model_path, timeout, processes, cache, heartbeat, warm_start,
+                                  flat_cache, symmetries)
+        return
+    if cache is not None:
+        text = "\n".join([model_text(model_path)] + constraints
+                         + [f"% groupes {json.dumps([s['classes'] for s in shards])} {share} {symmetries}"])
+        key = cache_key(config, text, solver_tag(solver))
+        hit = cache.get(key, timeout)
+        if hit is not None:
+            yield dict(hit, cached=True, final=True)
+            return
+
+    start = time.perf_counter()
+    deadline = time.time() + timeout * share
+    quotas = sharding.room_quotas(config, shards)
+    threads = max(1, processes // len(shards))
+    driver = minizinc.default_driver
+    ctx = multiprocessing.get_context("spawn")
+    results, procs, finals = ctx.Queue(), [], {}
+    for k, shard in enumerate(shards):
+        shard_infeasible, extra = _prepare(shard["config"], symmetries)
+        if shard_infeasible is not None:
+            finals[k] = shard_infeasible
+            continue
+        hint = warm_start_annotation(sharding.shard_hint(warm_start, shard), shard["config"]) if warm_start else None
+        procs.append(ctx.Process(target=_group_job, daemon=True,
+                                 args=(k, shard["config"], solver_tag(solver), str(model_path), deadline, threads,
+                                       extra + quotas[k], hint, results, str(driver.executable) if driver else None)))
+    for p in procs:
+        p.start()
+    try:
+        while len(finals) < len(shards):
+            try:
+                k, res = results.get(timeout=heartbeat or 0.5)
+            except queue.Empty:
+                if time.time() > deadline + 10 or not any(p.is_alive() for p in procs):
+                    break
+                if heartbeat:
+                    yield None
+                continue
+            finals[k] = res
+    finally:
+        for p in procs:
+            if p.is_alive():
+                p.terminate()
+            p.join()
+
+    solutions = [finals[k]["solution"] if has_solution(finals.get(k)) else None for k in range(len(shards))]
+    merged = sharding.merge(config, shards, solutions)
+    free = {c for shard, solution in zip(shards, solutions) if solution is None for c in shard["classes"]}
+    outcome, data = rooms.assign_rooms(merged, config)
+    if outcome == "ok":
+        merged["planning_salle"] = data
+    elif outcome == "conflit":
+        free |= {c for c, _, _ in data}
+    summary = {"groupes": [{"classes": ", ".join(map(str, shard["classes"])), "profs": len(shard["profs"]),
+                            "statut": finals[k]["status"] if k in finals else "ARRÊTÉ",
+                            "objectif": finals[k].get("objective") if k in finals else None}
+                           for k, shard in enumerate(shards)],
+               "salles": outcome, "classes_reparees": sorted(free)}
+    logger.info("groupes : %s, salles %s, %d classe(s) à réparer",
+                [g["statut"] for g in summary["groupes"]], outcome, len(free))
+
+    # Réparation : modèle complet, cours des autres classes fixés, profs choisis pour toute l'école
+    cells = {(c - 1, d, w) for c in free for d in range(config["nombre_heures_jour"]) for w in range(NB_JOURS)}
+    inst = build_instance(solver, config, model_path, [warm_start_annotation(merged, config)],
+                          constraints=constraints + _lns_fix_cells(merged, cells, with_rooms=outcome == "ok"))
+    best, timeline, last = None, [], None
+    for res in _iter_instance(inst, max(1.0, start + timeout - time.perf_counter()), processes, heartbeat):
+        if res is None:
+            yield None
+            continue
+        last = res
+        if has_solution(res) and not res["final"]:
+            best = dict(res, elapsed=time.perf_counter() - start)
+            timeline.append((round(best["elapsed"], 3), best["objective"]))
+            yield dict(best, timeline=list(timeline), groupes=summary)
+    status = last["status"]
+    if len(free) < config["num_classes"]:
+        # Cours fixés : l'optimum de la réparation n'est pas celui de l'école, et son échec ne prouve rien
+        status = {"OPTIMAL_SOLUTION": "SATISFIED", "UNSATISFIABLE": "UNKNOWN"}.get(status, status)
+    final = dict(last, status=status, elapsed=time.perf_counter() - start, timeline=timeline, groupes=summary,
+                 final=True)
+    if cache is not None:
+        cache.put(key, timeout, final)
+    yield final
+
+
+SOLVE_MODES = {
+    "pondere": iter_solutions,
+    "lexicographique": iter_lexicographic,
+    "lns": iter_lns,
+    "portefeuille": iter_portfolio,
+    "deux_phases": iter_two_phase,
+    "groupes": iter_groups,
+}
+
+
+def solve_config(config, solver=DEFAULT_SOLVER, model_path=MODEL_PATH, timeout=None, processes=8, cache=None,
+                 warm_start=None, mode="pondere", flat_cache=None, symmetries=False):
+    """Résout une configuration et renvoie le résultat final (voir `iter_solutions`)."""
+    final = None
+    for final in SOLVE_MODES[mode](config, solver, model_path, timeout, processes, cache,
+                                   warm_start=warm_start, flat_cache=flat_cache, symmetries=symmetries):
+        pass
+    return final
+
+
+def _solve_job(name, config, solver_id, model_path, timeout, threads, minizinc_path, cache_dir, warm_start, mode,
+               fzn_cache_dir, symmetries):
+    # Exécuté dans un processus du pool : le driver par défaut n'est pas hérité
+    try:
+        if minizinc_path:
+            minizinc.Driver(Path(minizinc_path)).make_default()
+        cache = ResultCache(cache_dir) if cache_dir else None
+        flat_cache = FlatZincCache(fzn_cache_dir) if fzn_cache_dir else None
+        return name, solve_config(config, solver_id, model_path, timeout, threads, cache, warm_start, mode, flat_cache,
+                                  symmetries)
+    except Exception as e:
+        return name, {"status": "ERROR", "error": f"{type(e).__name__}: {e}", "objective": None, "solution": None}
+
+
+def solve_batch(jobs, workers=None, timeout=None, threads=1, solver_id=DEFAULT_SOLVER,
+                model_path=MODEL_PATH, minizinc_path=None, cache_dir=None, warm_starts=None,
+                mode="pondere", fzn_cache_dir=None, symmetries=False):
+    """Résout plusieurs configurations en parallèle.
+
+    `jobs` est une liste de couples (nom, config). Chaque processus du pool lance
+    un solveur limité à `threads` threads et à `timeout` secondes (à défaut, le
+    timeout enregistré dans la configuration). Les résultats sont produits au fil
+    de l'eau, sous forme de couples (nom, résultat). `cache_dir` active le
+    cache de résultats partagé par les processus. `warm_starts` associe à un
+    nom de configuration la solution précédente à utiliser comme point de départ.
+    `mode` est une clé de SOLVE_MODES. `fzn_cache_dir` active le cache des
+    modèles FlatZinc compilés. `symmetries` active le bris de symétrie.
+    """
+    if workers is None:
+        workers = max(1, (os.cpu_count() or 1) // max(1, threads))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(_solve_job, name, config, solver_id, str(model_path), timeout, threads, minizinc_path, cache_dir,
+                        (warm_starts or {}).get(name), mode, fzn_cache_dir, symmetries)
+            for name, config in jobs
+        ]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def load_previous_solutions(directory):
+    """Solutions des fichiers <nom>.result.json d'un répertoire de résultats (sortie de cli.py)."""
+    solutions = {}
+    for f in Path(directory).glob("*.result.json"):
+        with open(f) as fh:
+            result = json.load(fh)
+        if has_solution(result):
+            solutions[f.name[:-len(".result.json")]] = result["solution"]
+    return solutions
+
+
+def load_configs(paths):
+    """Charge des configurations JSON depuis des fichiers ou des répertoires."""
+    jobs = []
+    for path in map(Path, paths):
+        files = sorted(path.glob("*.json")) if path.is_dir() else [path]
+        for f in files:
+            with open(f) as fh:
+                jobs.append((f.stem, json.load(fh)))
+    return jobs
@@ -0,0 +1,85 @@
+"""Vérifie que planning_lean.mzn est équivalent à planning.mzn sur des instances générées.
+
+Pour chaque graine : les deux modèles doivent donner le même statut et, quand
+ils prouvent l'optimalité, le même objectif. La solution du modèle allégé est
+ensuite imposée au modèle complet, qui doit l'accepter avec le même objectif.
+
+Exemple :
+    python equivalence.py --seeds 10 --timeout 60 --classes 2 3
+"""
+import argparse
+import datetime
+import sys
+
+import engine
+from instances import generate_config
+
+# Variables qui déterminent entièrement une solution (planning_prof et les
+# termes de l'objectif s'en déduisent)
+FIXED_VARIABLES = ["planning", "planning_salle", "prefs", "prof_to_class"]
+
+
+def _flatten(value):
+    if isinstance(value, list):
+        return [v for item in value for v in _flatten(item)]
+    return [value]
+
+
+def fix_solution(solution):
+    """Contraintes MiniZinc imposant les valeurs de `solution` (noms d'enum tels quels)."""
+    return [f"constraint array1d({name}) = [{', '.join(str(v) for v in _flatten(solution[name]))}];"
+            for name in FIXED_VARIABLES]
+
+
+def check_solution(config, solution, solver, timeout, model_path=engine.MODEL_PATH):
+    """Résout `model_path` avec la solution imposée ; renvoie le résultat (voir engine.result_to_dict)."""
+    config = engine.normalize_config(config)
+    inst = engine.build_instance(solver, config, model_path, constraints=fix_solution(solution))
+    engine.prepare_ortools_env()
+    return engine.result_to_dict(inst.solve(timeout=datetime.timedelta(seconds=timeout)))
+
+
+def compare(config, solver, timeout, processes=8):
+    """Résout `config` avec les deux modèles ; renvoie (complet, allégé, écarts), écarts vide si tout concorde."""
+    full = engine.solve_config(config, solver, engine.MODEL_PATH, timeout, processes)
+    lean = engine.solve_config(config, solver, engine.LEAN_MODEL_PATH, timeout, processes)
+    problems = []
+    for a, b in ((full, lean), (lean, full)):
+        if a["status"] == "UNSATISFIABLE" and engine.has_solution(b):
+            problems.append(f"faisabilité différente : complet={full['status']} allégé={lean['status']}")
+    if full["status"] == lean["status"] == "OPTIMAL_SOLUTION" and full["objective"] != lean["objective"]:
+        problems.append(f"optimums différents : complet={full['objective']} allégé={lean['objective']}")
+    if engine.has_solution(lean):
+        check = check_solution(config, lean["solution"], solver, timeout)
+        if not engine.has_solution(check):
+            problems.append(f"solution du modèle allégé refusée par planning.mzn ({check['status']})")
+        elif check["objective"] != lean["objective"]:
+            problems.append(f"objectif recalculé différent : {check['objective']} au lieu de {lean['objective']}")
+    return full, lean, problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Équivalence planning.mzn / planning_lean.mzn")
+    parser.add_argument("--seeds", type=int, default=5, help="nombre d'instances par taille (défaut: %(default)s)")
+    parser.add_argument("--classes", type=int, nargs="+", default=[2, 3], help="nombres de classes (défaut: %(default)s)")
+    parser.add_argument("--timeout", type=float, default=60, help="timeout par résolution (défaut: %(default)s)")
+    parser.add_argument("--solver", default=engine.DEFAULT_SOLVER, help="solveur MiniZinc (défaut: %(default)s)")
+    parser.add_argument("-t", "--threads", type=int, default=8, help="threads du solveur (défaut: %(default)s)")
+    args = parser.parse_args(argv)
+
+    failures = 0
+    for num_classes in args.classes:
+        for seed in range(args.seeds):
+            config = generate_config(seed, num_classes=num_classes, p_interdiction=0.3, p_affectation=0.2,
+                                     capacite_jitter=3)
+            full, lean, problems = compare(config, args.solver, args.timeout, args.threads)
+            print(f"{num_classes} classes, graine {seed}: complet={full['status']}/{full['objective']} "
+                  f"({full['elapsed']:.1f}s) allégé={lean['status']}/{lean['objective']} ({lean['elapsed']:.1f}s)")
+            for problem in problems:
+                print(f"  ÉCART : {problem}", file=sys.stderr)
+            failures += bool(problems)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""Export groupé des plannings d'une solution, en une seule passe sur les tableaux décodés.
+
+`export_zip` produit une archive contenant :
+- solution.npz : les tableaux de views.decode_solution (indices) et les noms des matières et salles ;
+- cours.parquet et cours.csv : un cours par ligne (classe, jour, heure, matière, prof, salle) ;
+- classes/, profs/, salles/ : la grille CSV et le calendrier ICS (événements hebdomadaires) de chaque entité.
+"""
+import datetime
+import io
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+import views
+from engine import MATIERES, SALLES
+
+PREMIERE_HEURE = 8  # H1 commence à 8h (voir views.heures_labels)
+
+
+def course_table(decoded):
+    """Un cours par ligne : classe, jour (1 = lundi), heure, matière, prof (0 si aucun), salle ("" si aucune)."""
+    c, d, w = np.nonzero(decoded["matiere"] != views.VOID)
+    salle = decoded["salle"][c, d, w]
+    return pd.DataFrame({
+        "classe": c + 1, "jour": w + 1, "heure": d + 1,
+        "matiere": np.array(MATIERES)[decoded["matiere"][c, d, w]],
+        "prof": decoded["prof"][c, d, w] + 1,
+        "salle": np.where(salle != views.EMPTY, np.array(SALLES)[salle], ""),
+    }).sort_values(["classe", "jour", "heure"], ignore_index=True)
+
+
+def _npz(decoded):
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **{k: v for k, v in decoded.items() if isinstance(v, np.ndarray)},
+                        n_heures=decoded["n_heures"], matieres=np.array(MATIERES + ["Void"]), salles=np.array(SALLES))
+    return buffer.getvalue()
+
+
+def _ics(nom, cours, resume, semaine, stamp):
+    # Calendrier d'une entité : une heure de cours ou plusieurs heures consécutives identiques = un événement
+    lignes = ["BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//Planning//Export//FR", f"X-WR-CALNAME:{nom}"]
+    blocs = []
+    for row in cours.sort_values(["jour", "heure"]).itertuples(index=False):
+        texte = resume(row)
+        if blocs and blocs[-1][0] == row.jour and blocs[-1][2] == row.heure - 1 \
+                and blocs[-1][3:] == [texte, row.salle]:
+            blocs[-1][2] = row.heure
+        else:
+            blocs.append([row.jour, row.heure, row.heure, texte, row.salle])
+    for jour, debut, fin, texte, salle in blocs:
+        date = semaine + datetime.timedelta(days=jour - 1)
+        lignes += ["BEGIN:VEVENT", f"UID:{nom.replace(' ', '-')}-{jour}-{debut}@planning", f"DTSTAMP:{stamp}",
+                   f"DTSTART:{date:%Y%m%d}T{PREMIERE_HEURE + debut - 1:02d}0000",
+                   f"DTEND:{date:%Y%m%d}T{PREMIERE_HEURE + fin:02d}0000",
+                   "RRULE:FREQ=WEEKLY", f"SUMMARY:{texte}"]
+        if salle:
+            lignes.append(f"LOCATION:{salle}")
+        lignes.append("END:VEVENT")
+    lignes.append("END:VCALENDAR")
+    return "\r\n".join(lignes) + "\r\n"
+
+
+def export_zip(decoded, semaine=None):
+    """Archive zip (bytes) de tous les plannings d'une solution décodée (views.decode_solution).
+
+    Les calendriers ICS se répètent chaque semaine à partir de la semaine du
+    lundi `semaine` (par défaut la semaine en cours).
+    """
+    if semaine is None:
+        today = datetime.date.today()
+        semaine = today - datetime.timedelta(days=today.weekday())
+    stamp = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    cours = course_table(decoded)
+    grilles = views.occupations(decoded)
+    parquet = io.BytesIO()
+    cours.to_parquet(parquet, index=False)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("solution.npz", _npz(decoded))
+        archive.writestr("cours.parquet", parquet.getvalue())
+        archive.writestr("cours.csv", cours.to_csv(index=False))
+        par_classe = dict(list(cours.groupby("classe")))
+        for c in range(len(decoded["matiere"])):
+            nom = f"Classe {c + 1}"
+            archive.writestr(f"classes/Classe_{c + 1}.csv", views.class_frame(decoded, c).to_csv())
+            archive.writestr(f"classes/Classe_{c + 1}.ics", _ics(
+                nom, par_classe.get(c + 1, cours.iloc[:0]),
+                lambda r: f"{r.matiere} (P{r.prof})" if r.prof else r.matiere, semaine, stamp))
+        par_prof = dict(list(cours.groupby("prof")))
+        for p in views.recruited(decoded):
+            nom = f"P{p + 1}"
+            archive.writestr(f"profs/{nom}.csv", views.teacher_frame(decoded, grilles, p).to_csv())
+            archive.writestr(f"profs/{nom}.ics", _ics(
+                nom, par_prof.get(p + 1, cours.iloc[:0]), lambda r: f"{r.matiere} - Classe {r.classe}", semaine, stamp))
+        par_salle = dict(list(cours.groupby("salle")))
+        for i in views.ROOMS:
+            nom = SALLES[i]
+            archive.writestr(f"salles/{nom}.csv", views.room_frame(decoded, grilles, i).to_csv())
+            archive.writestr(f"salles/{nom}.ics", _ics(
+                nom, par_salle.get(nom, cours.iloc[:0]), lambda r: f"Classe {r.classe} - {r.matiere}", semaine, stamp))
+    return buffer.getvalue()
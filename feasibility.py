@@ -0,0 +1,265 @@
+"""Pré-vérification rapide de la faisabilité et explication des configurations insatisfiables.
+
+`check` teste en Python, en quelques millisecondes, des conditions
+nécessaires déduites du modèle (créneaux disponibles, pause déjeuner,
+mercredi après-midi, EPS en début de journée, capacité et compatibilité des
+salles, charge maximale des profs) : si l'une d'elles échoue, le modèle est
+insatisfiable et le solveur n'est pas lancé. Il calcule aussi une borne
+inférieure du nombre de profs, ajoutée au modèle (`bound_constraints`).
+
+Quand le solveur conclut malgré tout à l'insatisfiabilité, `explain_unsat`
+cherche un sous-ensemble minimal de contraintes incompatibles (MUS) avec
+findMUS et le traduit en groupes de contraintes du modèle.
+"""
+import itertools
+import re
+import subprocess
+import tempfile
+from pathlib import Path
+
+import minizinc
+
+import diagnostics
+import engine
+import symmetry
+
+MAX_HEURES_PROF = 24  # planning.mzn : sum(planning_prof[p, .., ..]) <= 24
+MAX_HEURES_JOUR = 3  # par matière et par jour
+MATIERES_UNE_PAR_JOUR = {"Anglais", "Espagnol"}
+CRENEAUX_EPS = 2  # EPS seulement sur les heures 1 et 2
+MERCREDI = 3
+
+# Groupes de contraintes, nommés comme les sections des modèles (voir diagnostics.model_sections)
+QUOTAS = "Quotas d'heures par matière"
+HORAIRES_CLASSES = "Contraintes horaires (classes)"
+PEDAGOGIE = "Contraintes pédagogiques"
+HORAIRES_PROFS = "Contraintes horaires (profs)"
+SALLES = "Salles"
+
+TRACE = re.compile(r"([^\s|\"';]+\.mzn)\|(\d+)\|")
+
+
+def day_slots(n_heures, jour, bloque=()):
+    """Nombre maximal d'heures de cours possibles un jour donné (classe ou prof).
+
+    Pause déjeuner (hors mercredi) : l'heure 5 est libre, et l'heure 4 ou
+    l'heure 6 aussi. Mercredi : rien après l'heure 4. `bloque` contient les
+    heures interdites (demi-journée d'indisponibilité d'un prof).
+    """
+    libres = {d for d in range(1, n_heures + 1) if d not in bloque}
+    if jour == MERCREDI:
+        return len({d for d in libres if d <= 4})
+    if n_heures < 6:
+        # Pas d'heure 6 : l'heure 4 est forcément libre (n < 5 : modèle insatisfiable, voir check)
+        return len(libres - {4, 5})
+    return len(libres - {5}) - (4 in libres and 6 in libres)
+
+
+def room_slots(n_heures, jour):
+    """Nombre de créneaux où une salle peut accueillir un cours un jour donné.
+
+    Contrairement à `day_slots`, une salle n'a pas de pause déjeuner à elle :
+    l'heure 5 est libre pour toutes les classes, mais l'heure 4 d'une classe
+    et l'heure 6 d'une autre peuvent occuper la même salle.
+    """
+    if jour == MERCREDI:
+        return min(n_heures, 4)
+    if n_heures < 6:
+        return len(set(range(1, n_heures + 1)) - {4, 5})
+    return n_heures - 1
+
+
+def blocked_slots(interdiction, n_heures):
+    """(jour, heures interdites) d'une indisponibilité de prof (1 à 10), None si aucune."""
+    if interdiction <= 0:
+        return None
+    jour = (interdiction + 1) // 2
+    heures = range(1, 5) if interdiction % 2 == 1 else range(5, n_heures + 1)
+    return jour, set(heures)
+
+
+def prof_capacity(config, p):
+    """Nombre maximal d'heures que le prof p (à partir de 0) peut assurer dans la semaine."""
+    n = config["nombre_heures_jour"]
+    bloque = blocked_slots(config["interdictions"][p], n)
+    total = sum(day_slots(n, w, bloque[1] if bloque and bloque[0] == w else ()) for w in range(1, engine.NB_JOURS + 1))
+    return min(MAX_HEURES_PROF, total)
+
+
+def _min_profs(demande, capacites):
+    # Plus petit nombre de profs (les plus disponibles d'abord) couvrant `demande` heures, None si impossible
+    if demande <= 0:
+        return 0
+    total = 0
+    for k, cap in enumerate(sorted(capacites, reverse=True), start=1):
+        total += cap
+        if total >= demande:
+            return k
+    return None
+
+
+def _problem(groupe, message):
+    return {"groupe": groupe, "message": message}
+
+
+def _check_slots(config, heures):
+    n = config["nombre_heures_jour"]
+    problems = []
+    if n < 5:
+        problems.append(_problem(HORAIRES_CLASSES, f"{n} heures par jour : la pause déjeuner porte sur les heures 4 à 6, "
+                                                   "il faut au moins 5 heures par jour."))
+        return problems
+    par_jour = [day_slots(n, w) for w in range(1, engine.NB_JOURS + 1)]
+    total = sum(heures.values())
+    if total > sum(par_jour):
+        problems.append(_problem(QUOTAS, f"{total} heures de cours par classe et par semaine, mais seulement "
+                                         f"{sum(par_jour)} créneaux hors pause déjeuner et mercredi après-midi."))
+    for m, h in heures.items():
+        if m == "EPS":
+            maximum = engine.NB_JOURS * CRENEAUX_EPS
+            if h >= 2 and h % 2:
+                problems.append(_problem(PEDAGOGIE, f"EPS : {h} heures, mais l'EPS se fait par blocs de deux heures "
+                                                    "(heures 1 et 2) dès 2 heures par semaine."))
+        elif m in MATIERES_UNE_PAR_JOUR:
+            maximum = sum(1 for s in par_jour if s > 0)
+        else:
+            maximum = sum(min(MAX_HEURES_JOUR, s) for s in par_jour)
+        if h > maximum:
+            problems.append(_problem(PEDAGOGIE, f"{m} : {h} heures par semaine, au plus {maximum} possibles "
+                                                "avec les limites par jour."))
+    return problems
+
+
+def _check_rooms(config, heures):
+    tailles, capacites = config["tailles_classes"], config["capacites_salles"]
+    n = config["nombre_heures_jour"]
+    creneaux = sum(room_slots(n, w) for w in range(1, engine.NB_JOURS + 1))
+    problems = []
+    for c, taille in enumerate(tailles, start=1):
+        for m in heures:
+            if not any(capacites[engine.SALLES.index(s)] >= taille for s in symmetry.SALLES_COMPATIBLES[m]):
+                problems.append(_problem(SALLES, f"Classe {c} ({taille} élèves) : aucune salle compatible avec {m} "
+                                                 "n'est assez grande."))
+    if problems:
+        return problems
+    # Condition de Hall par seuil d'effectif : les classes d'au moins t élèves n'utilisent
+    # que les salles d'au moins t places, une classe par salle et par créneau
+    signales, pools = [], set()
+    for k in range(1, len(heures) + 1):
+        for groupe in itertools.combinations(heures, k):
+            if any(set(s) <= set(groupe) for s in signales):
+                continue
+            fenetre = engine.NB_JOURS * CRENEAUX_EPS if groupe == ("EPS",) else creneaux
+            for t in sorted(set(tailles)):
+                demande = sum(heures[m] for m in groupe) * sum(1 for x in tailles if x >= t)
+                salles = {s for m in groupe for s in symmetry.SALLES_COMPATIBLES[m]
+                          if capacites[engine.SALLES.index(s)] >= t}
+                if demande > len(salles) * fenetre:
+                    signales.append(groupe)
+                    if frozenset(salles) in pools:
+                        break  # même manque de salles qu'un groupe déjà signalé
+                    pools.add(frozenset(salles))
+                    problems.append(_problem(SALLES, f"{', '.join(groupe)} : {demande} heures de cours pour les classes "
+                                                     f"d'au moins {t} élèves, mais {len(salles)} salle(s) adaptée(s) × "
+                                                     f"{fenetre} créneaux = {len(salles) * fenetre}."))
+                    break
+    return problems
+
+
+def _check_profs(config, heures):
+    n_classes = config["num_classes"]
+    capacites = [prof_capacity(config, p) for p in range(config["nombre_profs"])]
+    affectations = config["affectations_raw"]
+    libres = [capacites[p] for p, a in enumerate(affectations) if a == 0]
+    problems, besoins, minimum = [], 0, 0
+    for i, m in enumerate(engine.MATIERES):
+        if m not in heures:
+            continue
+        demande = heures[m] * n_classes
+        affectes = [capacites[p] for p, a in enumerate(affectations) if a == i + 1]
+        k = _min_profs(demande, affectes + libres)
+        if k is None:
+            problems.append(_problem(HORAIRES_PROFS, f"{m} : {demande} heures à assurer ({heures[m]} h × {n_classes} "
+                                                     f"classes), mais les profs qui peuvent l'enseigner en assurent "
+                                                     f"au plus {sum(affectes) + sum(libres)}."))
+            continue
+        minimum += k
+        besoins += _min_profs(max(0, demande - sum(affectes)), libres) or 0
+    if not problems and besoins > len(libres):
+        problems.append(_problem(HORAIRES_PROFS, f"Il faut au moins {besoins} profs sans affectation pour compléter "
+                                                 f"les profs affectés, il n'y en a que {len(libres)}."))
+    return problems, minimum
+
+
+def check(config):
+    """Conditions nécessaires de faisabilité de `config`.
+
+    Renvoie {"problems": [{"groupe", "message"}, ...], "min_profs": borne
+    inférieure du nombre de profs recrutés}. Une liste de problèmes non vide
+    garantit que le modèle est insatisfiable.
+    """
+    config = engine.normalize_config(config)
+    heures = {m: h for m, h in zip(engine.MATIERES, config["nombre_heures_cours"]) if h > 0}
+    problems = _check_slots(config, heures)
+    if config["nombre_heures_jour"] < 5:
+        return {"problems": problems, "min_profs": 0}
+    problems += _check_rooms(config, heures)
+    prof_problems, minimum = _check_profs(config, heures)
+    return {"problems": problems + prof_problems, "min_profs": minimum}
+
+
+def bound_constraints(config, report=None):
+    """Borne inférieure du nombre de profs à ajouter au modèle (liste d'items)."""
+    minimum = (report or check(config))["min_profs"]
+    return [f"constraint obj_prof_used >= {minimum};"] if minimum > 0 else []
+
+
+def _dzn(data):
+    # Paramètres (voir engine.config_to_data) au format .dzn
+    def value(v):
+        if isinstance(v, range):
+            return f"{v.start}..{v.stop - 1}"
+        if isinstance(v, list):
+            return "[" + ", ".join(str(x) for x in v) + "]"
+        return str(v)
+    return "\n".join(f"{k} = {value(v)};" for k, v in data.items()) + "\n"
+
+
+def explain_unsat(config, model_path=None, constraints=(), timeout=60):
+    """Groupes de contraintes d'un sous-ensemble minimal insatisfiable (findMUS).
+
+    Renvoie [{"groupe", "lignes"}, ...] : sections du modèle (voir
+    diagnostics.model_sections) et numéros de ligne des contraintes du MUS ;
+    les contraintes ajoutées au modèle (`constraints`) forment le groupe
+    "(contraintes ajoutées)". Liste vide si aucun MUS n'est trouvé dans le
+    temps imparti.
+    """
+    config = engine.normalize_config(config)
+    text = engine.model_text(model_path or engine.MODEL_PATH)
+    driver = minizinc.default_driver
+    if driver is None:
+        raise RuntimeError("exécutable minizinc introuvable")
+    with tempfile.TemporaryDirectory() as tmp:
+        model = Path(tmp) / "modele.mzn"
+        model.write_text("\n".join([text] + list(constraints)) + "\n")
+        data = Path(tmp) / "donnees.dzn"
+        data.write_text(_dzn(engine.config_to_data(config)))
+        try:
+            proc = subprocess.run([str(driver.executable), "--solver", "findMUS", str(model), str(data)],
+                                  capture_output=True, text=True, timeout=timeout)
+        except subprocess.TimeoutExpired as e:
+            proc = e
+        output = proc.stdout or ""
+        if isinstance(output, bytes):
+            output = output.decode(errors="replace")
+    if isinstance(proc, subprocess.CompletedProcess) and proc.returncode != 0 and "MUS" not in output:
+        raise RuntimeError(proc.stderr.strip() or f"findMUS a échoué (code {proc.returncode})")
+    sections = diagnostics.model_sections(text)
+    groupes = {}
+    for fichier, ligne in TRACE.findall(output):
+        if Path(fichier).name != model.name:
+            continue  # bibliothèque standard (globals, stdlib)
+        ligne = int(ligne)
+        groupe = sections[ligne] if ligne < len(sections) else "(contraintes ajoutées)"
+        groupes.setdefault(groupe, set()).add(ligne)
+    return [{"groupe": g, "lignes": sorted(lignes)} for g, lignes in groupes.items()]
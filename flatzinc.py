@@ -0,0 +1,208 @@
+"""Cache des modèles FlatZinc compilés.
+
+L'aplatissement de planning.mzn (forall/element/sommes réifiées sur
+CLASS × PROFS × DAY) coûte cher et est refait à chaque résolution. Ce module
+conserve la paire .fzn/.ozn produite pour une instance (clé : contenu exact du
+modèle et des données + solveur) et, lors d'un succès, lance le solveur
+directement sur le .fzn, dont la sortie brute est décodée en Python.
+"""
+import hashlib
+import json
+import os
+import queue
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import minizinc
+from minizinc.result import set_stat
+
+from cache import DEFAULT_CACHE_DIR
+
+DEFAULT_FZN_CACHE_DIR = DEFAULT_CACHE_DIR / "flatzinc"
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+ASSIGNMENT = re.compile(r"^(\w+) = (.*);$")
+ARRAY = re.compile(r"^array\d+d\((.*)\[(.*)\]\)$", re.S)
+STATUS_LINES = {
+    "==========": "OPTIMAL_SOLUTION",
+    "=====UNSATISFIABLE=====": "UNSATISFIABLE",
+    "=====UNKNOWN=====": "UNKNOWN",
+    "=====UNBOUNDED=====": "UNBOUNDED",
+    "=====ERROR=====": "ERROR",
+}
+
+
+def instance_key(inst, solver_id):
+    """Hash du contenu exact des fichiers (modèle, fragments, données) de l'instance."""
+    h = hashlib.sha256(str(solver_id).encode())
+    with inst.files() as files:
+        for f in files:
+            h.update(b"\0" + Path(f).read_bytes())
+    return h.hexdigest()
+
+
+class FlatZincCache:
+    """Un répertoire <clé>/ (model.fzn, model.ozn, stats.json) par instance ; éviction LRU."""
+
+    def __init__(self, directory=DEFAULT_FZN_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def get(self, key):
+        entry = self.directory / key
+        if not (entry / "stats.json").exists():
+            return None
+        os.utime(entry)
+        with open(entry / "stats.json") as f:
+            return entry / "model.fzn", json.load(f)
+
+    def compile(self, inst, key):
+        """Aplatit l'instance et enregistre le résultat ; renvoie (chemin .fzn, statistiques)."""
+        start = time.perf_counter()
+        with inst.flat(**{"output-objective": True}) as (fzn, ozn, stats):
+            flatten_time = time.perf_counter() - start
+            tmp = Path(self.directory / f".{key}.{os.getpid()}")
+            tmp.mkdir(exist_ok=True)
+            shutil.copyfile(fzn.name, tmp / "model.fzn")
+            shutil.copyfile(ozn.name, tmp / "model.ozn")
+        stats = {k: v.total_seconds() if hasattr(v, "total_seconds") else v for k, v in stats.items()}
+        stats["flatten_time"] = flatten_time
+        with open(tmp / "stats.json", "w") as f:
+            json.dump(stats, f)
+        try:
+            os.replace(tmp, self.directory / key)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)  # compilé en parallèle par un autre processus
+        self.evict()
+        return self.directory / key / "model.fzn", stats
+
+    def evict(self):
+        entries = []
+        for d in self.directory.iterdir():
+            if not d.is_dir() or d.name.startswith("."):
+                continue
+            try:
+                size = sum(f.stat().st_size for f in d.iterdir())
+                entries.append((d.stat().st_mtime, size, d))
+            except FileNotFoundError:
+                continue
+        total = sum(size for _, size, _ in entries)
+        for _, size, d in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(d, ignore_errors=True)
+            total -= size
+
+
+def _parse_scalar(text):
+    text = text.strip()
+    if text in ("true", "false"):
+        return text == "true"
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+
+def _reshape(values, dims):
+    if len(dims) <= 1:
+        return values
+    step = len(values) // dims[0]
+    return [_reshape(values[i * step:(i + 1) * step], dims[1:]) for i in range(dims[0])]
+
+
+def parse_value(text, enum=None):
+    """Valeur FlatZinc (entier, booléen, arrayNd(...)) -> valeur Python ; `enum` traduit les entiers en noms."""
+    text = text.strip()
+    m = ARRAY.match(text)
+    if m:
+        dims = [int(hi) - int(lo) + 1 for lo, hi in re.findall(r"(-?\d+)\.\.(-?\d+)", m.group(1))]
+        values = [_parse_scalar(v) for v in m.group(2).split(",") if v.strip()]
+        if enum:
+            values = [enum[v - 1] for v in values]
+        return _reshape(values, dims)
+    value = _parse_scalar(text)
+    return enum[value - 1] if enum else value
+
+
+def _read_lines(stream, lines):
+    for line in stream:
+        lines.put(line.rstrip("\n"))
+    lines.put(None)
+
+
+def iter_flatzinc(fzn, solver, timeout, processes, heartbeat=None, enums=None, flat_stats=None):
+    """Lance le solveur sur un .fzn et produit les résultats avec le même protocole que engine.iter_solutions.
+
+    `enums` associe un nom de variable à la liste ordonnée des noms de son enum
+    (FlatZinc ne manipule que des entiers).
+    """
+    enums = enums or {}
+    cmd = [str(minizinc.default_driver.executable), "--solver", solver.id, "--statistics",
+           "-i", "-p", str(processes),
+           "--time-limit", str(int(timeout * 1000)), str(fzn)]
+    start = time.perf_counter()
+    stderr = tempfile.TemporaryFile(mode="w+")
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr, text=True)
+    lines = queue.Queue()
+    threading.Thread(target=_read_lines, args=(proc.stdout, lines), daemon=True).start()
+
+    best, timeline, status = None, [], None
+    current, statistics = {}, dict(flat_stats or {})
+    try:
+        while True:
+            try:
+                line = lines.get(timeout=heartbeat)
+            except queue.Empty:
+                yield None
+                continue
+            if line is None:
+                break
+            if line.startswith("%%%mzn-stat:"):
+                name, _, value = line[len("%%%mzn-stat:"):].strip().partition("=")
+                set_stat(statistics, name, value)
+            elif line == "----------":
+                elapsed = time.perf_counter() - start
+                objective = current.pop("_objective", None)
+                if "prof_to_class" in current and "prof_est_utilise" not in current:
+                    # Non présent dans les variables de sortie du FlatZinc : dérivé de prof_to_class
+                    current["prof_est_utilise"] = [int(any(row)) for row in current["prof_to_class"]]
+                best = {"status": "SATISFIED", "objective": objective, "solution": dict(current, objective=objective),
+                        "statistics": {k: v.total_seconds() if hasattr(v, "total_seconds") else v
+                                       for k, v in statistics.items()},
+                        "elapsed": elapsed}
+                timeline.append((round(elapsed, 3), objective))
+                best.update(timeline=list(timeline), final=False)
+                current = {}
+                yield best
+            elif line in STATUS_LINES:
+                status = STATUS_LINES[line]
+            else:
+                m = ASSIGNMENT.match(line)
+                if m:
+                    current[m.group(1)] = parse_value(m.group(2), enums.get(m.group(1)))
+        proc.wait()
+    finally:
+        if proc.poll() is None:
+            proc.terminate()
+            proc.wait()
+        stderr.seek(0)
+        message = stderr.read()
+        stderr.close()
+
+    if proc.returncode != 0 and status is None:
+        raise minizinc.MiniZincError(message=message)
+    elapsed = time.perf_counter() - start
+    stats = {k: v.total_seconds() if hasattr(v, "total_seconds") else v for k, v in statistics.items()}
+    if best is None:
+        final = {"status": status or "UNKNOWN", "objective": None, "solution": None, "statistics": stats}
+    else:
+        final = dict(best, status=status or "SATISFIED", statistics=stats)
+    final.update(elapsed=elapsed, timeline=timeline, final=True)
+    yield final
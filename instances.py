@@ -0,0 +1,59 @@
+"""Générateur d'instances (configurations au format de l'app) reproductibles par graine."""
+import random
+
+import engine
+
+# Indices de interdictions proposés dans l'app (demi-journées)
+INTERDICTIONS = [1, 2, 3, 4, 5, 7, 8, 9, 10]
+
+
+def generate_config(seed, num_classes=3, nombre_profs=11, nombre_heures_jour=10, taille_classes=(25, 33),
+                    capacite_jitter=0, p_interdiction=0.0, p_affectation=0.0, timeout=60):
+    """Configuration aléatoire mais déterministe pour une graine donnée.
+
+    Les tailles de classes sont tirées dans `taille_classes`, les capacités des
+    salles autour des valeurs par défaut (± `capacite_jitter`, sans descendre
+    sous l'effectif de la plus grande classe), et chaque prof
+    reçoit une interdiction (resp. une affectation) avec probabilité
+    `p_interdiction` (resp. `p_affectation`).
+    """
+    rng = random.Random(seed)
+    capacites = [max(0, c + rng.randint(-capacite_jitter, capacite_jitter)) if c else 0
+                 for c in engine.DEFAULT_CAPACITES]
+    tailles = [rng.randint(*taille_classes) for _ in range(num_classes)]
+    if capacite_jitter:
+        # Le bruit ne doit pas laisser une classe sans salle assez grande
+        capacites = [max(c, max(tailles)) if c else 0 for c in capacites]
+    return {
+        "nombre_heures_jour": nombre_heures_jour,
+        "nombre_profs": nombre_profs,
+        "num_classes": num_classes,
+        "tailles_classes": tailles,
+        "capacites_salles": capacites,
+        "interdictions": [rng.choice(INTERDICTIONS) if rng.random() < p_interdiction else 0
+                          for _ in range(nombre_profs)],
+        "affectations_raw": [rng.randint(1, len(engine.MATIERES)) if rng.random() < p_affectation else 0
+                             for _ in range(nombre_profs)],
+        "timeout": timeout,
+        "nombre_heures_cours": list(engine.DEFAULT_HEURES_COURS),
+    }
+
+
+# Familles d'instances du banc d'essai (benchmark.py) : de l'instance de
+# l'app (3 classes) aux grosses écoles, avec journées courtes, effectifs
+# hétérogènes, capacités bruitées, interdictions et affectations.
+FAMILIES = {
+    "petite": {"num_classes": 3, "nombre_profs": 11},
+    "moyenne": {"num_classes": 6, "nombre_profs": 20, "p_interdiction": 0.2},
+    "journees_courtes": {"num_classes": 4, "nombre_profs": 14, "nombre_heures_jour": 8},
+    "effectifs_varies": {"num_classes": 6, "nombre_profs": 20, "taille_classes": (18, 36), "capacite_jitter": 4},
+    "contraintes_profs": {"num_classes": 5, "nombre_profs": 18, "p_interdiction": 0.5, "p_affectation": 0.5},
+    # 10 classes : 2 h d'EPS chacune remplissent les 2 salles × 10 créneaux d'EPS de la semaine
+    "grande": {"num_classes": 10, "nombre_profs": 34, "p_interdiction": 0.2, "p_affectation": 0.2},
+}
+
+
+def benchmark_instances(seeds=1, families=None):
+    """Couples (nom, config) de chaque famille pour les graines 0..seeds-1."""
+    return [(f"{family}-{seed}", generate_config(seed, **FAMILIES[family]))
+            for family in (families or FAMILIES) for seed in range(seeds)]
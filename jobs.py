@@ -0,0 +1,188 @@
+"""File d'attente locale des résolutions, partagée par toutes les sessions de l'app.
+
+Chaque résolution soumise reçoit un identifiant ; elle attend qu'assez de
+threads solveur soient libres (le total des threads des résolutions en cours
+ne dépasse jamais `max_threads`), puis tourne dans un thread de fond. L'état
+et le meilleur résultat courant sont consultables à tout moment, une
+résolution peut être annulée (le solveur est arrêté, la meilleure solution
+est conservée) et chaque travail est enregistré sur disque dans
+<répertoire>/<identifiant>.json, ce qui permet de retrouver les résultats
+après un redémarrage. Seuls les `max_finished` derniers travaux terminés, de
+moins de `max_age` secondes, sont gardés, en mémoire comme sur disque.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import deque
+from pathlib import Path
+
+import diagnostics
+import engine
+from cache import DEFAULT_CACHE_DIR
+
+DEFAULT_JOBS_DIR = DEFAULT_CACHE_DIR / "jobs"
+DEFAULT_MAX_THREADS = int(os.environ.get("PLANNING_MAX_THREADS", os.cpu_count() or 1))
+DEFAULT_MAX_FINISHED = 100
+DEFAULT_MAX_AGE = 7 * 24 * 3600  # secondes
+
+EN_ATTENTE, EN_COURS, TERMINE, ANNULE, ERREUR = "en_attente", "en_cours", "termine", "annule", "erreur"
+ACTIFS = {EN_ATTENTE, EN_COURS}
+
+
+class JobQueue:
+    """File FIFO de résolutions, exécutées en arrière-plan sous un plafond global de threads solveur."""
+
+    def __init__(self, max_threads=DEFAULT_MAX_THREADS, directory=DEFAULT_JOBS_DIR, max_finished=DEFAULT_MAX_FINISHED,
+                 max_age=DEFAULT_MAX_AGE):
+        self.max_threads = max(1, max_threads)
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_finished = max_finished
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._queue = deque()
+        self._threads_used = 0
+        with self._lock:
+            self._prune()
+
+    def submit(self, config, solver=engine.DEFAULT_SOLVER, model_path=engine.MODEL_PATH, timeout=None, threads=8,
+               mode="pondere", warm_start=None, symmetries=False, cache=None, flat_cache=None):
+        """Ajoute une résolution à la file et renvoie son identifiant.
+
+        Les paramètres sont ceux de engine.SOLVE_MODES[mode] ; `threads` est
+        ramené à `max_threads`.
+        """
+        job_id = uuid.uuid4().hex[:12]
+        threads = min(max(1, threads), self.max_threads)
+        job = {
+            "id": job_id, "state": EN_ATTENTE, "submitted": time.time(), "started": None, "finished": None,
+            "config": engine.normalize_config(config), "mode": mode, "solver": engine.solver_tag(solver),
+            "model": str(model_path), "timeout": timeout, "threads": threads, "symmetries": symmetries,
+            "result": None, "error": None,
+        }
+        with self._lock:
+            self._jobs[job_id] = dict(job, _solver=solver, _warm_start=warm_start, _cache=cache,
+                                      _flat_cache=flat_cache, _cancel=threading.Event())
+            self._queue.append(job_id)
+            self._save(job)
+            self._dispatch()
+        return job_id
+
+    def get(self, job_id):
+        """Instantané du travail (état, position dans la file, meilleur résultat) ou None s'il est inconnu."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                snapshot = {k: v for k, v in job.items() if not k.startswith("_")}
+                snapshot["position"] = self._queue.index(job_id) + 1 if job_id in self._queue else None
+                return snapshot
+        path = self._path(job_id)
+        if not path.exists():
+            return None
+        with open(path) as f:
+            job = json.load(f)
+        if job["state"] in ACTIFS:
+            # Enregistré par un processus qui s'est arrêté avant la fin du travail
+            job.update(state=ERREUR, error="interrompu par un redémarrage du serveur")
+        return job
+
+    def cancel(self, job_id):
+        """Annule un travail en attente, ou arrête le solveur d'un travail en cours."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["state"] not in ACTIFS:
+                return False
+            if job["state"] == EN_ATTENTE:
+                self._queue.remove(job_id)
+                job.update(state=ANNULE, finished=time.time())
+                self._save(job)
+                self._prune()
+            else:
+                job["_cancel"].set()
+            return True
+
+    def jobs(self):
+        """Instantanés de tous les travaux connus de ce processus, du plus récent au plus ancien."""
+        with self._lock:
+            ids = sorted(self._jobs, key=lambda i: self._jobs[i]["submitted"], reverse=True)
+        return [self.get(i) for i in ids]
+
+    def _path(self, job_id):
+        return self.directory / f"{job_id}.json"
+
+    def _save(self, job):
+        data = {k: v for k, v in job.items() if not k.startswith("_")}
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, self._path(job["id"]))
+
+    def _prune(self):
+        # Appelé sous self._lock : oublie les travaux terminés au-delà de max_finished ou de max_age,
+        # en mémoire puis sur disque (fichiers des processus précédents compris, datés par leur mtime)
+        now = time.time()
+        finished = sorted((j for j in self._jobs.values() if j["state"] not in ACTIFS),
+                          key=lambda j: j["finished"], reverse=True)
+        for i, job in enumerate(finished):
+            if i >= self.max_finished or now - job["finished"] > self.max_age:
+                del self._jobs[job["id"]]
+        files = []
+        for path in self.directory.glob("*.json"):
+            job = self._jobs.get(path.stem)
+            if job is None or job["state"] not in ACTIFS:
+                try:
+                    files.append((path.stat().st_mtime, path))
+                except FileNotFoundError:
+                    continue
+        for i, (mtime, path) in enumerate(sorted(files, reverse=True)):
+            if i >= self.max_finished or now - mtime > self.max_age:
+                path.unlink(missing_ok=True)
+
+    def _dispatch(self):
+        # Appelé sous self._lock : lance les travaux en tête de file tant que le plafond le permet
+        while self._queue:
+            job = self._jobs[self._queue[0]]
+            if self._threads_used + job["threads"] > self.max_threads:
+                break
+            self._queue.popleft()
+            self._threads_used += job["threads"]
+            job.update(state=EN_COURS, started=time.time())
+            self._save(job)
+            threading.Thread(target=self._run, args=(job,), daemon=True).start()
+
+    def _run(self, job):
+        results = engine.SOLVE_MODES[job["mode"]](
+            job["config"], job["_solver"], job["model"], job["timeout"], job["threads"], job["_cache"],
+            heartbeat=0.5, warm_start=job["_warm_start"], flat_cache=job["_flat_cache"],
+            symmetries=job["symmetries"],
+        )
+        state, error = TERMINE, None
+        try:
+            for res in results:
+                if job["_cancel"].is_set():
+                    state = ANNULE
+                    break
+                if res is not None:
+                    with self._lock:
+                        job["result"] = res
+                        self._save(job)
+        except Exception as e:
+            state, error = ERREUR, f"{type(e).__name__}: {e}"
+        finally:
+            results.close()
+            with self._lock:
+                if state == ANNULE and job["result"] is not None:
+                    job["result"] = dict(job["result"], final=False)
+                job.update(state=state, error=error, finished=time.time())
+                self._save(job)
+                self._prune()
+                self._threads_used -= job["threads"]
+                self._dispatch()
+            if job["result"] is not None:
+                diagnostics.log_solve(job["result"], {"job": job["id"], "state": state, "mode": job["mode"],
+                                                      "model": Path(job["model"]).name, "solver": job["solver"],
+                                                      "classes": job["config"]["num_classes"]})
@@ -0,0 +1,256 @@
+"""Affectation des salles après coup, pour le mode deux phases (engine.iter_two_phase).
+
+La phase 1 résout le modèle sans la couche salles (bloc « Salles » des
+modèles) mais avec `aggregated_constraints` : par créneau, les classes d'au
+moins t élèves qui suivent un groupe de matières ne peuvent pas être plus
+nombreuses que les salles compatibles d'au moins t places. La phase 2
+(`assign_rooms`) choisit les salles jour par jour : un bloc d'heures
+consécutives de la même matière garde la même salle, une salle n'accueille
+qu'une classe à la fois. Si un jour n'admet aucune affectation, `assign_rooms`
+renvoie un ensemble de cours incompatibles, que `conflict_cut` interdit pour la
+résolution suivante.
+"""
+import itertools
+
+import engine
+import symmetry
+
+MAX_NODES = 200000  # nœuds de la recherche exhaustive d'un jour
+
+
+def usable_rooms(config, c, matiere):
+    """Salles compatibles avec `matiere` et assez grandes pour la classe c (à partir de 0), plus petites d'abord."""
+    taille, capacites = config["tailles_classes"][c], config["capacites_salles"]
+    salles = [s for s in symmetry.SALLES_COMPATIBLES[matiere] if capacites[engine.SALLES.index(s)] >= taille]
+    return sorted(salles, key=lambda s: (capacites[engine.SALLES.index(s)], engine.SALLES.index(s)))
+
+
+def _connected(sets):
+    # Les ensembles se chevauchent de proche en proche (sinon la contrainte de l'union est impliquée)
+    reached, rest = set(sets[0]), list(sets[1:])
+    while rest:
+        linked = [x for x in rest if x & reached]
+        if not linked:
+            return False
+        for x in linked:
+            reached |= x
+            rest.remove(x)
+    return True
+
+
+def capacity_bounds(config):
+    """Bornes de capacité agrégées : triplets (matières, classes à partir de 1, nombre de salles).
+
+    Par créneau, les classes de `classes` ne peuvent pas être plus de
+    `nombre de salles` à suivre une des `matières`.
+    """
+    config = engine.normalize_config(config)
+    tailles, capacites = config["tailles_classes"], config["capacites_salles"]
+    enseignees = [m for m, h in zip(engine.MATIERES, config["nombre_heures_cours"]) if h > 0]
+    compatibles = sorted({frozenset(symmetry.SALLES_COMPATIBLES[m]) for m in enseignees}, key=sorted)
+    pools = [frozenset().union(*g) for k in range(1, len(compatibles) + 1)
+             for g in itertools.combinations(compatibles, k) if _connected(g)]
+    bounds = []
+    for pool, t in itertools.product(pools, sorted(set(tailles))):
+        salles = {s for s in pool if capacites[engine.SALLES.index(s)] >= t}
+        classes = frozenset(c for c, x in enumerate(tailles, start=1) if x >= t)
+        # Matières dont toutes les salles utilisables par ces classes sont dans le groupe
+        groupe = frozenset(m for m in enseignees
+                           if {s for s in symmetry.SALLES_COMPATIBLES[m] if capacites[engine.SALLES.index(s)] >= t} <= salles)
+        if groupe and len(classes) > len(salles):
+            bounds.append((groupe, classes, len(salles)))
+    # Une borne est inutile si une autre compte plus de matières et de classes pour moins de salles
+    return [b for i, b in enumerate(bounds)
+            if not any(j != i and o[0] >= b[0] and o[1] >= b[1] and o[2] <= b[2] and (o != b or j < i)
+                       for j, o in enumerate(bounds))]
+
+
+def bound_constraint(groupe, classes, n, days="w in WEEK"):
+    """Contrainte MiniZinc d'une borne de capacité, sur les jours `days` (générateur MiniZinc sur w)."""
+    return (f"constraint forall(d in DAY, {days}) (sum(c in {{{', '.join(map(str, sorted(classes)))}}}) "
+            f"(bool2int(planning[c, d, w] in {{{', '.join(m for m in engine.MATIERES if m in groupe)}}})) <= {n});")
+
+
+def aggregated_constraints(config):
+    """Contraintes de capacité agrégées par créneau (liste d'items MiniZinc)."""
+    return [bound_constraint(groupe, classes, n) for groupe, classes, n in capacity_bounds(config)]
+
+
+def _blocks(planning, w):
+    # Blocs (classe, matière, première heure, dernière heure) du jour w, heures à partir de 0
+    blocks = []
+    for c, rows in enumerate(planning):
+        d = 0
+        while d < len(rows):
+            m = rows[d][w]
+            e = d
+            while e + 1 < len(rows) and rows[e + 1][w] == m:
+                e += 1
+            if m != "Void":
+                blocks.append((c, m, d, e))
+            d = e + 1
+    return blocks
+
+
+def _greedy(blocks, candidates):
+    # Heure par heure, chaque nouveau bloc prend la plus petite salle libre (couplage si besoin)
+    rooms = {}
+    for d in sorted({b[2] for b in blocks}):
+        starting = [b for b in blocks if b[2] == d]
+        held = {r for b, r in rooms.items() if b[2] < d <= b[3]}
+        match = _matching(starting, candidates, held)
+        if match is None:
+            return None
+        rooms.update(match)
+    return rooms
+
+
+def _matching(blocks, candidates, held, violator=None):
+    # Couplage biparti (chemins augmentants) entre blocs et salles libres ; en cas
+    # d'échec, `violator` reçoit les blocs atteints (ensemble de Hall : trop de blocs pour leurs salles)
+    owner = {}
+
+    def augment(b, seen, reached):
+        reached.add(b)
+        for r in candidates[b]:
+            if r in held or r in seen:
+                continue
+            seen.add(r)
+            if r not in owner or augment(owner[r], seen, reached):
+                owner[r] = b
+                return True
+        return False
+
+    for b in blocks:
+        reached = set()
+        if not augment(b, set(), reached):
+            if violator is not None:
+                violator.update(reached)
+            return None
+    return {b: r for r, b in owner.items()}
+
+
+def _slot_conflict(blocks, candidates, n_heures):
+    # Conflit sur un seul créneau (sans la règle des heures consécutives), None s'il n'y en a pas
+    for d in range(n_heures):
+        present = [b for b in blocks if b[2] <= d <= b[3]]
+        violator = set()
+        if _matching(present, candidates, set(), violator) is None:
+            return [(c, m, d, d) for c, m, _, _ in violator]
+    return None
+
+
+class _Limit(Exception):
+    pass
+
+
+def _search(blocks, candidates):
+    """Affectation complète des blocs d'un jour ({bloc: salle}), None si aucune n'existe.
+
+    Lève _Limit si la recherche dépasse MAX_NODES nœuds.
+    """
+    order = sorted(blocks, key=lambda b: (b[2], len(candidates[b])))
+    rooms, occupied, nodes = {}, set(), [0]
+
+    def free(b, r):
+        return all((r, d) not in occupied for d in range(b[2], b[3] + 1))
+
+    def matchable(i, b):
+        # Sur chaque heure du bloc posé, les blocs restants ont encore assez de salles libres
+        rest = order[i + 1:]
+        for d in range(b[2], b[3] + 1):
+            present = [x for x in rest if x[2] <= d <= x[3]]
+            held = {r for r, d2 in occupied if d2 == d}
+            if present and _matching(present, candidates, held) is None:
+                return False
+        return True
+
+    def dfs(i):
+        if i == len(order):
+            return True
+        nodes[0] += 1
+        if nodes[0] > MAX_NODES:
+            raise _Limit()
+        b = order[i]
+        for r in candidates[b]:
+            if free(b, r):
+                rooms[b] = r
+                occupied.update((r, d) for d in range(b[2], b[3] + 1))
+                if matchable(i, b) and dfs(i + 1):
+                    return True
+                occupied.difference_update((r, d) for d in range(b[2], b[3] + 1))
+                del rooms[b]
+        return False
+
+    return dict(rooms) if dfs(0) else None
+
+
+def _components(blocks, candidates):
+    # Groupes de blocs indépendants : deux blocs interagissent s'ils se chevauchent et partagent une salle
+    parent = {b: b for b in blocks}
+
+    def find(b):
+        while parent[b] != b:
+            parent[b] = parent[parent[b]]
+            b = parent[b]
+        return b
+
+    for b, b2 in itertools.combinations(blocks, 2):
+        if b[2] <= b2[3] and b2[2] <= b[3] and set(candidates[b]) & set(candidates[b2]):
+            parent[find(b)] = find(b2)
+    groups = {}
+    for b in blocks:
+        groups.setdefault(find(b), []).append(b)
+    return list(groups.values())
+
+
+def _minimal_conflict(blocks, candidates):
+    # Suppression un par un des blocs qui ne participent pas au conflit
+    conflict = list(blocks)
+    for b in list(conflict):
+        rest = [x for x in conflict if x != b]
+        try:
+            if _search(rest, candidates) is None:
+                conflict = rest
+        except _Limit:
+            pass
+    return conflict
+
+
+def assign_rooms(solution, config):
+    """Salles d'une solution de la phase 1.
+
+    Renvoie ("ok", planning_salle), ("conflit", [(classe, heure, matière), ...])
+    avec les cours (indices à partir de 1) qui ne peuvent pas avoir de salles
+    ensemble, quel que soit le jour, ou ("inconnu", None) si la recherche d'un
+    jour dépasse MAX_NODES nœuds.
+    """
+    config = engine.normalize_config(config)
+    planning = solution["planning"]
+    planning_salle = [[["Empty"] * len(row) for row in rows] for rows in planning]
+    for w in range(engine.NB_JOURS):
+        blocks = _blocks(planning, w)
+        candidates = {b: usable_rooms(config, b[0], b[1]) for b in blocks}
+        for group in _components(blocks, candidates):
+            rooms = _greedy(group, candidates)
+            if rooms is None:
+                conflict = _slot_conflict(group, candidates, len(planning[0]))
+                if conflict is None:
+                    try:
+                        rooms = _search(group, candidates)
+                    except _Limit:
+                        return "inconnu", None
+                    if rooms is None:
+                        conflict = _minimal_conflict(group, candidates)
+                if conflict is not None:
+                    return "conflit", sorted({(c + 1, d + 1, m) for c, m, s, e in conflict for d in range(s, e + 1)})
+            for (c, m, s, e), r in rooms.items():
+                for d in range(s, e + 1):
+                    planning_salle[c][d][w] = r
+    return "ok", planning_salle
+
+
+def conflict_cut(cells):
+    """Contrainte MiniZinc qui interdit ces cours ensemble, tous les jours."""
+    conjonction = " /\\ ".join(f"planning[{c}, {d}, w] = {m}" for c, d, m in cells)
+    return f"constraint forall(w in WEEK) (not ({conjonction}));"
@@ -0,0 +1,151 @@
+"""Découpage d'une école en groupes de classes résolus séparément, pour le mode groupes (engine.iter_groups).
+
+Chaque groupe de classes (donné par la clé "groupes_classes" de la
+configuration, ou formé automatiquement) reçoit une part des profs et, par
+jour, une part de chaque borne de capacité des salles (`rooms.capacity_bounds`) :
+les parts d'une borne se somment au nombre de salles, les plannings des
+groupes réunis (`merge`) respectent donc les bornes de l'école entière. Les
+groupes sont résolus sans la couche salles ; les salles sont affectées ensuite
+sur l'école entière (`rooms.assign_rooms`).
+"""
+import engine
+import feasibility
+import rooms
+
+MIN_CLASSES = 2  # classes par groupe formé automatiquement
+
+
+def _check_groups(groups, n_classes):
+    classes = sorted(c for g in groups for c in g)
+    if classes != list(range(1, n_classes + 1)) or not all(groups):
+        raise ValueError(f"groupes_classes : chaque classe de 1 à {n_classes} doit figurer dans exactement un groupe")
+
+
+def auto_groups(config, n_groups):
+    """`n_groups` groupes de classes (à partir de 1) d'effectifs variés : classes triées par taille, distribuées en serpentin."""
+    tailles = config["tailles_classes"]
+    order = sorted(range(1, len(tailles) + 1), key=lambda c: (-tailles[c - 1], c))
+    groups = [[] for _ in range(n_groups)]
+    for i, c in enumerate(order):
+        tour, k = divmod(i, n_groups)
+        groups[k if tour % 2 == 0 else n_groups - 1 - k].append(c)
+    return [sorted(g) for g in groups]
+
+
+def split_profs(config, groups):
+    """Profs (à partir de 0) de chaque groupe, au prorata du nombre de classes, affectation par affectation."""
+    shares = [[] for _ in groups]
+    for a in sorted(set(config["affectations_raw"])):
+        counts = [0] * len(groups)
+        for p, aff in enumerate(config["affectations_raw"]):
+            if aff == a:
+                k = min(range(len(groups)), key=lambda k: (counts[k] / len(groups[k]), -len(groups[k]), k))
+                counts[k] += 1
+                shares[k].append(p)
+    return [sorted(s) for s in shares]
+
+
+def sub_config(config, classes, profs):
+    """Configuration réduite aux classes (à partir de 1) et profs (à partir de 0) d'un groupe."""
+    return dict(config, num_classes=len(classes), nombre_profs=len(profs),
+                tailles_classes=[config["tailles_classes"][c - 1] for c in classes],
+                interdictions=[config["interdictions"][p] for p in profs],
+                affectations_raw=[config["affectations_raw"][p] for p in profs],
+                nombre_heures_cours=config["nombre_heures_cours"][:len(engine.MATIERES)],
+                groupes_classes=None)
+
+
+def plan(config, max_groups):
+    """Groupes de la configuration : [{"classes", "profs", "config"}, ...].
+
+    Sans "groupes_classes", le plus grand nombre de groupes (au plus
+    `max_groups`, au moins MIN_CLASSES classes chacun) dont toutes les
+    configurations réduites passent `feasibility.check`, un seul groupe sinon.
+    """
+    config = engine.normalize_config(config)
+    n_classes = config["num_classes"]
+    imposed = bool(config.get("groupes_classes"))
+    if imposed:
+        groups = [sorted(int(c) for c in g) for g in config["groupes_classes"]]
+        _check_groups(groups, n_classes)
+        candidates = [groups]
+    else:
+        candidates = [auto_groups(config, n) for n in range(min(max_groups, n_classes // MIN_CLASSES), 1, -1)]
+    for groups in candidates:
+        profs = split_profs(config, groups)
+        shards = [{"classes": g, "profs": p, "config": sub_config(config, g, p)} for g, p in zip(groups, profs)]
+        if imposed or not any(feasibility.check(s["config"])["problems"] for s in shards):
+            return shards
+    return [{"classes": list(range(1, n_classes + 1)), "profs": list(range(config["nombre_profs"])), "config": config}]
+
+
+def room_quotas(config, shards):
+    """Contraintes de capacité de chaque groupe (listes d'items MiniZinc, classes renumérotées).
+
+    Pour chaque borne (matières, classes, n salles), le groupe reçoit chaque
+    jour une part de n proportionnelle à ses classes concernées ; le reste de
+    la division va, jour après jour, aux groupes les plus en retard sur leur
+    part de la semaine.
+    """
+    items = [[] for _ in shards]
+    for groupe, classes, n in rooms.capacity_bounds(config):
+        members = [(k, [i for i, c in enumerate(s["classes"], start=1) if c in classes]) for k, s in enumerate(shards)]
+        members = [(k, local) for k, local in members if local]
+        total = sum(len(local) for _, local in members)
+        given = [0] * len(members)
+        days = [{} for _ in members]  # part -> jours
+        for w in range(1, engine.NB_JOURS + 1):
+            quotas = [n * len(local) // total for _, local in members]
+            # Salles restantes aux groupes les plus en retard sur leur part depuis le début de la semaine
+            retard = [n * len(local) * w / total - g - q for (_, local), g, q in zip(members, given, quotas)]
+            for i in sorted(range(len(members)), key=lambda i: (-retard[i], i))[:n - sum(quotas)]:
+                quotas[i] += 1
+            for i, q in enumerate(quotas):
+                given[i] += q
+                days[i].setdefault(q, []).append(w)
+        for (k, local), parts in zip(members, days):
+            for q, ws in parts.items():
+                if q < len(local):
+                    week = "w in WEEK" if len(ws) == engine.NB_JOURS else f"w in {{{', '.join(map(str, ws))}}}"
+                    items[k].append(rooms.bound_constraint(groupe, local, q, week))
+    return items
+
+
+def merge(config, shards, solutions):
+    """Solution de l'école entière à partir des solutions des groupes (None pour un groupe sans solution).
+
+    Les classes d'un groupe sans solution sont vides (Void) ; planning_salle
+    est laissé vide, à affecter par `rooms.assign_rooms`.
+    """
+    n_d, n_p = config["nombre_heures_jour"], config["nombre_profs"]
+    planning = [None] * config["num_classes"]
+    prefs = [[0] * (len(engine.MATIERES) + 1) for _ in range(n_p)]
+    prof_to_class = [[0] * config["num_classes"] for _ in range(n_p)]
+    for shard, solution in zip(shards, solutions):
+        for i, c in enumerate(shard["classes"]):
+            planning[c - 1] = solution["planning"][i] if solution else [["Void"] * engine.NB_JOURS for _ in range(n_d)]
+        if solution:
+            for j, p in enumerate(shard["profs"]):
+                prefs[p] = list(solution["prefs"][j])
+                prof_to_class[p] = [0] * config["num_classes"]
+                for i, c in enumerate(shard["classes"]):
+                    prof_to_class[p][c - 1] = solution["prof_to_class"][j][i]
+    return {"planning": planning, "planning_salle": [[["Empty"] * engine.NB_JOURS for _ in range(n_d)] for _ in planning],
+            "prefs": prefs, "prof_to_class": prof_to_class}
+
+
+def shard_hint(solution, shard):
+    """Partie d'une solution de l'école entière (démarrage à chaud) qui concerne un groupe.
+
+    Comme `engine.warm_start_annotation`, seules les classes et les profs
+    présents dans la solution précédente sont repris.
+    """
+    planning, salles = solution.get("planning") or [], solution.get("planning_salle") or []
+    rows = [c - 1 for c in shard["classes"] if c <= min(len(planning), len(salles))]
+    hint = {"planning": [planning[c] for c in rows], "planning_salle": [salles[c] for c in rows]}
+    prefs, prof_to_class = solution.get("prefs") or [], solution.get("prof_to_class") or []
+    profs = [p for p in shard["profs"] if p < min(len(prefs), len(prof_to_class))]
+    if all(c < len(prof_to_class[p]) for p in profs for c in rows):
+        hint["prefs"] = [prefs[p] for p in profs]
+        hint["prof_to_class"] = [[prof_to_class[p][c] for c in rows] for p in profs]
+    return hint
@@ -0,0 +1,74 @@
+"""Bris de symétrie pour les professeurs, classes et salles interchangeables.
+
+Les classes d'équivalence sont calculées en Python à partir de la
+configuration et traduites en contraintes MiniZinc ajoutées au modèle
+(planning.mzn ou planning_lean.mzn). Toutes les contraintes retiennent, dans
+chaque orbite de solutions, la solution lexicographiquement la plus grande
+pour l'ordre des variables prof_est_utilise, planning, planning_salle, prefs,
+prof_to_class : elles sont donc compatibles entre elles et avec la chaîne
+prof_est_utilise[p] >= prof_est_utilise[p+1] du modèle, et ne changent pas
+l'optimum.
+"""
+from collections import defaultdict
+
+import engine
+
+# Copie de salles_compatibles (planning.mzn), hors Void
+SALLES_COMPATIBLES = {
+    "EnseignementScientifique": {"S101", "S102", "S201", "S202", "S203", "S204"},
+    "Anglais": {"S101", "S102", "S201", "S202", "S203", "S204"},
+    "Espagnol": {"S101", "S102", "S201", "S202", "S203", "S204"},
+    "Mathematiques": {"S101", "S102", "S201", "S202", "S203", "S204"},
+    "HistoireGeographie": {"S101", "S102", "S201", "S202", "S204"},
+    "Physique": {"LaboPhysique1", "LaboPhysique2", "LaboChimie"},
+    "EPS": {"Gymnase", "Stade"},
+    "Philosophie": {"S101", "S102", "S201", "S202", "S203", "S204"},
+    "Option": {"S101", "S102", "S201", "S202", "S203", "S204"},
+}
+
+
+def _groups(items, signature):
+    """Groupes (d'au moins deux éléments, dans l'ordre croissant) de même signature."""
+    groups = defaultdict(list)
+    for item in items:
+        groups[signature(item)].append(item)
+    return [g for g in groups.values() if len(g) > 1]
+
+
+def equivalence_classes(config):
+    """Professeurs, classes et salles interchangeables de `config`.
+
+    Renvoie {"profs": [[p, ...], ...], "classes": [...], "salles": [[nom, ...], ...]},
+    les professeurs et classes étant numérotés à partir de 1 comme dans le modèle.
+    """
+    config = engine.normalize_config(config)
+    profs = _groups(range(1, config["nombre_profs"] + 1),
+                    lambda p: (config["interdictions"][p - 1], config["affectations_raw"][p - 1]))
+    classes = _groups(range(1, config["num_classes"] + 1), lambda c: config["tailles_classes"][c - 1])
+    salles = _groups([s for s in engine.SALLES if s != "Empty"],
+                     lambda s: (config["capacites_salles"][engine.SALLES.index(s)],
+                                frozenset(m for m in engine.MATIERES if s in SALLES_COMPATIBLES[m])))
+    return {"profs": profs, "classes": classes, "salles": salles}
+
+
+def symmetry_constraints(config):
+    """Contraintes MiniZinc de bris de symétrie pour `config` (liste d'items)."""
+    classes = equivalence_classes(config)
+    items = []
+    for group in classes["profs"]:
+        for p, q in zip(group, group[1:]):
+            # Le plus petit numéro est utilisé en priorité, puis départagé par prefs et prof_to_class
+            items.append(f"constraint lex_greatereq([prof_est_utilise[{p}]] ++ prefs[{p}, ..] ++ prof_to_class[{p}, ..], "
+                         f"[prof_est_utilise[{q}]] ++ prefs[{q}, ..] ++ prof_to_class[{q}, ..]);")
+    for group in classes["classes"]:
+        for c, c2 in zip(group, group[1:]):
+            items.append(f"constraint lex_greatereq([enum2int(planning[{c}, d, w]) | d in DAY, w in WEEK], "
+                         f"[enum2int(planning[{c2}, d, w]) | d in DAY, w in WEEK]);")
+    for group in classes["salles"]:
+        # La salle de plus grand indice apparaît la première dans planning_salle
+        chain = ", ".join(group[::-1])
+        items.append(f"constraint value_precede_chain([enum2int(s) | s in [{chain}]], "
+                     f"[enum2int(s) | s in array1d(planning_salle)]);")
+    if items:
+        items.insert(0, 'include "globals.mzn";')
+    return items
@@ -0,0 +1,14 @@
+import json
+
+import diagnostics
+
+
+def test_read_log_tail(tmp_path):
+    path = tmp_path / "solves.jsonl"
+    with open(path, "w") as f:
+        for i in range(5000):
+            f.write(json.dumps({"i": i, "pad": "x" * (i % 50)}) + "\n")
+    assert [e["i"] for e in diagnostics.read_log(path, limit=20)] == list(range(4980, 5000))
+    assert [e["i"] for e in diagnostics.read_log(path, limit=1)] == [4999]
+    assert len(diagnostics.read_log(path)) == 5000
+    assert [e["i"] for e in diagnostics.read_log(path, limit=10000)] == list(range(5000))
@@ -0,0 +1,130 @@
+import sys
+import time
+import types
+
+import pytest
+
+import engine
+import flatzinc
+
+
+def test_lexicographic_reports_weighted_objective(monkeypatch):
+    stages = engine.LEXICOGRAPHIC_STAGES[:3]
+    monkeypatch.setattr(engine, "build_instance", lambda *args, **kwargs: args[4])
+
+    def run(objective, *args):
+        # Étape k : critère k + 1, objectif pondéré 1000 - k
+        k = stages.index(objective)
+        res = {"status": "SATISFIED", "objective": k + 1, "statistics": {}, "elapsed": 0.1,
+               "solution": {"objective": k + 1, "obj_pondere": 1000 - k, "planning": []}}
+        yield dict(res, final=False)
+        yield dict(res, status="OPTIMAL_SOLUTION", final=True)
+    monkeypatch.setattr(engine, "_run_instance", run)
+
+    results = list(engine.iter_lexicographic({}, timeout=60, stages=stages))
+    final = results[-1]
+    assert final["objective"] == 998 and final["solution"]["objective"] == 998
+    assert "obj_pondere" not in final["solution"]
+    assert [obj for _, obj in final["timeline"]] == [1000, 999, 998]
+    assert [s["valeur"] for s in final["stages"]] == [1, 2, 3]
+    assert [r["objective"] for r in results[:-1]] == [1000, 999, 998]
+
+
+def test_lexicographic_weighted_objective_from_flatzinc(monkeypatch, tmp_path):
+    # Faux FlatZinc : comme un vrai, le solveur n'affiche que les variables de l'item output du modèle
+    solver = tmp_path / "solver"
+    solver.write_text(f"#!{sys.executable}\nimport sys\nk, shown = open(sys.argv[-1]).read().split()\n"
+                      "if shown == '1':\n    print(f'obj_pondere = {1000 - int(k)};')\n"
+                      "print(f'_objective = {int(k) + 1};\\n----------\\n==========')\n")
+    solver.chmod(0o755)
+    monkeypatch.setattr(flatzinc.minizinc, "default_driver", types.SimpleNamespace(executable=solver))
+
+    class Model:
+        def add_string(self, text):
+            self.text = text
+
+        def __setitem__(self, name, value):
+            pass
+    monkeypatch.setattr(engine.minizinc, "Model", Model)
+    monkeypatch.setattr(engine.minizinc, "Instance", lambda solver, model: model)
+    monkeypatch.setattr(engine, "lookup_solver", lambda solver: types.SimpleNamespace(id="factice"))
+    stages = engine.LEXICOGRAPHIC_STAGES[:2]
+
+    def compile_stage(inst, solver_id):
+        k = [i for i, (sense, expr) in enumerate(stages) if f"{sense} {expr};" in inst.text][0]
+        output = inst.text[engine.OUTPUT_ITEM.search(inst.text).start():]
+        fzn = tmp_path / f"{k}.fzn"
+        fzn.write_text(f"{k} {int('obj_pondere' in output.split(';')[0])}")
+        return fzn
+
+    class FlatCache:
+        def get(self, fzn):
+            return fzn, {}
+    monkeypatch.setattr(engine, "instance_key", compile_stage)
+
+    results = list(engine.iter_lexicographic({}, timeout=60, stages=stages, flat_cache=FlatCache()))
+    final = results[-1]
+    assert [r["objective"] for r in results] == [1000, 999, 999]
+    assert [obj for _, obj in final["timeline"]] == [1000, 999]
+    assert [s["valeur"] for s in final["stages"]] == [1, 2]
+
+
+def test_portfolio_members_within_budget(monkeypatch):
+    monkeypatch.setattr(engine.minizinc.Solver, "lookup", staticmethod(lambda tag: tag))
+    for processes in range(1, 10):
+        members = engine.portfolio_members(processes)
+        assert sum(threads for _, threads, _ in members) == processes
+        assert members[0][0] == engine.DEFAULT_SOLVER
+    assert len(engine.portfolio_members(2)) == 2
+    assert len(engine.portfolio_members(8)) == 4
+
+
+def _stub_result(config, objective, final):
+    n_c, n_d = config["num_classes"], config["nombre_heures_jour"]
+    solution = {"planning": [[["Void"] * engine.NB_JOURS for _ in range(n_d)] for _ in range(n_c)],
+                "planning_salle": [[["Empty"] * engine.NB_JOURS for _ in range(n_d)] for _ in range(n_c)],
+                "prefs": [[0] * (len(engine.MATIERES) + 1) for _ in range(config["nombre_profs"])],
+                "prof_to_class": [[int(p == 0)] * n_c for p in range(config["nombre_profs"])]}
+    return {"status": "SATISFIED", "objective": objective, "solution": solution, "statistics": {},
+            "elapsed": 0.0, "timeline": [(0.0, objective)], "final": final}
+
+
+@pytest.mark.parametrize("heartbeat", [None, 0.2])
+def test_lns_leaves_stalled_initial_solve(monkeypatch, heartbeat):
+    config = engine.normalize_config({})
+    monkeypatch.setattr(engine, "build_instance", lambda *args, **kwargs: None)
+
+    def stalled(inst, solver, timeout, processes, heartbeat=None, flat_cache=None):
+        # Une solution tout de suite, puis plus rien jusqu'à la fin du temps
+        yield _stub_result(config, 10, False)
+        end = time.perf_counter() + timeout
+        while time.perf_counter() < end:
+            time.sleep(heartbeat)
+            yield None
+        yield _stub_result(config, 10, True)
+
+    def iteration(inst, timeout, processes, heartbeat=None, random_seed=None):
+        time.sleep(0.1)
+        yield _stub_result(config, 9, True)
+    monkeypatch.setattr(engine, "_run_instance", stalled)
+    monkeypatch.setattr(engine, "_iter_instance", iteration)
+
+    results = [r for r in engine.iter_lns(config, timeout=3, heartbeat=heartbeat) if r is not None]
+    assert [r["final"] for r in results].count(True) == 1 and results[-1]["final"]
+    assert results[-1]["lns"]["iterations"] > 0 and results[-1]["objective"] == 9
+
+
+def test_lexicographic_stage_minimum(monkeypatch):
+    budgets = []
+    monkeypatch.setattr(engine, "build_instance", lambda *args, **kwargs: None)
+
+    def run(inst, solver, timeout, *args):
+        # Chaque étape consomme tout son temps
+        budgets.append(timeout)
+        time.sleep(timeout)
+        yield {**_stub_result(engine.normalize_config({}), 1, True), "status": "SATISFIED"}
+    monkeypatch.setattr(engine, "_run_instance", run)
+
+    final = list(engine.iter_lexicographic({}, timeout=5))[-1]
+    assert budgets[0] >= 2
+    assert final["solution"] is not None and len(final["stages"]) == len(budgets) < len(engine.LEXICOGRAPHIC_STAGES)
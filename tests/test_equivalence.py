@@ -0,0 +1,26 @@
+import minizinc
+import pytest
+
+import engine
+import equivalence
+from instances import generate_config
+
+
+def _solver_installed():
+    if minizinc.default_driver is None:
+        return False
+    try:
+        minizinc.Solver.lookup(engine.DEFAULT_SOLVER)
+    except LookupError:
+        return False
+    return True
+
+
+@pytest.mark.skipif(not _solver_installed(), reason=f"MiniZinc ou {engine.DEFAULT_SOLVER} non installé")
+@pytest.mark.parametrize("seed", range(3))
+def test_lean_model_matches_full_model(seed):
+    # Mêmes instances que `python equivalence.py --classes 2`
+    config = generate_config(seed, num_classes=2, p_interdiction=0.3, p_affectation=0.2, capacite_jitter=3)
+    full, lean, problems = equivalence.compare(config, engine.DEFAULT_SOLVER, timeout=30, processes=4)
+    assert engine.has_solution(full) and engine.has_solution(lean)
+    assert not problems
@@ -0,0 +1,28 @@
+import engine
+import feasibility
+
+
+def test_room_has_no_lunch_break():
+    # Une seule salle de 40 places pour l'option : 4 jours × 5 créneaux + mercredi 4 = 24 créneaux
+    capacites = [40] + [30] * 5 + engine.DEFAULT_CAPACITES[6:]
+    config = {"num_classes": 7, "tailles_classes": [40] * 7, "nombre_heures_jour": 6, "nombre_profs": 11,
+              "capacites_salles": capacites, "nombre_heures_cours": [0, 0, 0, 0, 0, 0, 0, 0, 3]}
+    assert feasibility.check(config)["problems"] == []
+
+
+def test_ten_default_classes_fit_classrooms():
+    config = {"num_classes": 10, "tailles_classes": [30] * 10, "nombre_profs": 50}
+    assert not [p for p in feasibility.check(config)["problems"] if p["groupe"] == feasibility.SALLES]
+
+
+def test_room_shortage_still_detected():
+    capacites = [40] + [30] * 5 + engine.DEFAULT_CAPACITES[6:]
+    config = {"num_classes": 9, "tailles_classes": [40] * 9, "nombre_heures_jour": 6, "nombre_profs": 11,
+              "capacites_salles": capacites, "nombre_heures_cours": [0, 0, 0, 0, 0, 0, 0, 0, 3]}
+    assert [p["groupe"] for p in feasibility.check(config)["problems"]] == [feasibility.SALLES]
+
+
+def test_benchmark_instances_pass_check():
+    import instances
+    for name, config in instances.benchmark_instances(seeds=3):
+        assert feasibility.check(config)["problems"] == [], name
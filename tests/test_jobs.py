@@ -0,0 +1,35 @@
+import json
+import os
+import time
+
+import diagnostics
+import engine
+import jobs
+
+
+def _wait(queue, job_ids):
+    end = time.monotonic() + 10
+    while any(queue.get(i) and queue.get(i)["state"] in jobs.ACTIFS for i in job_ids):
+        assert time.monotonic() < end
+        time.sleep(0.01)
+
+
+def test_finished_jobs_are_pruned(monkeypatch, tmp_path):
+    def instant(config, *args, **kwargs):
+        yield {"status": "SATISFIED", "objective": 1, "solution": None, "final": True}
+    monkeypatch.setitem(engine.SOLVE_MODES, "instantane", instant)
+    monkeypatch.setattr(diagnostics, "log_solve", lambda *args, **kwargs: None)
+
+    old = tmp_path / "ancien.json"
+    old.write_text(json.dumps({"id": "ancien", "state": jobs.TERMINE}))
+    os.utime(old, (time.time() - 3600, time.time() - 3600))
+    queue = jobs.JobQueue(max_threads=1, directory=tmp_path, max_finished=2, max_age=60)
+    assert not old.exists()
+
+    ids = []
+    for _ in range(4):
+        ids.append(queue.submit({}, mode="instantane", threads=1))
+        _wait(queue, ids)
+    assert [job["id"] for job in queue.jobs()] == ids[:1:-1]
+    assert sorted(p.stem for p in tmp_path.glob("*.json")) == sorted(ids[2:])
+    assert queue.get(ids[0]) is None
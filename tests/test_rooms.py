@@ -0,0 +1,57 @@
+import engine
+import rooms
+import symmetry
+
+
+def _planning(config, courses):
+    # courses : {(classe, heure): matière}, indices à partir de 0, le lundi ; le reste est Void
+    return [[[courses.get((c, d), "Void") if w == 0 else "Void" for w in range(engine.NB_JOURS)]
+             for d in range(config["nombre_heures_jour"])] for c in range(config["num_classes"])]
+
+
+def _conflict_config():
+    # S203 (35 places) seule assez grande pour la classe 2, S204 (30) seule salle d'histoire-géo :
+    # la classe 1 devrait changer de salle au milieu de son bloc de maths
+    capacites = [0] * len(engine.SALLES)
+    capacites[engine.SALLES.index("S203")], capacites[engine.SALLES.index("S204")] = 35, 30
+    config = engine.normalize_config({"num_classes": 3, "tailles_classes": [25, 33, 25], "capacites_salles": capacites})
+    courses = {(0, 0): "Mathematiques", (0, 1): "Mathematiques", (1, 0): "Mathematiques", (2, 1): "HistoireGeographie"}
+    return config, {"planning": _planning(config, courses)}
+
+
+def test_assign_rooms_feasible():
+    config = engine.normalize_config({"num_classes": 3})
+    courses = {(0, 0): "Physique", (0, 1): "Physique", (0, 2): "Mathematiques", (0, 3): "Mathematiques",
+               (1, 0): "Physique", (1, 1): "HistoireGeographie", (1, 2): "HistoireGeographie",
+               (2, 0): "EPS", (2, 1): "EPS", (2, 2): "Mathematiques"}
+    planning = _planning(config, courses)
+    status, planning_salle = rooms.assign_rooms({"planning": planning}, config)
+    assert status == "ok"
+    for d in range(config["nombre_heures_jour"]):
+        occupied = [planning_salle[c][d][0] for c in range(3) if planning[c][d][0] != "Void"]
+        assert len(occupied) == len(set(occupied))
+    for (c, d), m in courses.items():
+        salle = planning_salle[c][d][0]
+        assert salle in symmetry.SALLES_COMPATIBLES[m]
+        assert config["capacites_salles"][engine.SALLES.index(salle)] >= config["tailles_classes"][c]
+    # Un bloc d'heures consécutives garde sa salle
+    assert planning_salle[0][0][0] == planning_salle[0][1][0] and planning_salle[1][1][0] == planning_salle[1][2][0]
+
+
+def test_minimal_conflict_and_cut():
+    config, solution = _conflict_config()
+    assert rooms.assign_rooms(solution, config) == ("conflit", [
+        (1, 1, "Mathematiques"), (1, 2, "Mathematiques"), (2, 1, "Mathematiques"), (3, 2, "HistoireGeographie")])
+    # Un bloc sans rapport (autre heure) est retiré du conflit
+    blocks = rooms._blocks(solution["planning"], 0) + [(0, "Mathematiques", 5, 5)]
+    candidates = {b: rooms.usable_rooms(config, b[0], b[1]) for b in blocks}
+    assert sorted(rooms._minimal_conflict(blocks, candidates)) == sorted(rooms._blocks(solution["planning"], 0))
+    assert rooms.conflict_cut([(1, 1, "Mathematiques"), (3, 2, "HistoireGeographie")]) == (
+        "constraint forall(w in WEEK) (not (planning[1, 1, w] = Mathematiques /\\ "
+        "planning[3, 2, w] = HistoireGeographie));")
+
+
+def test_search_node_limit(monkeypatch):
+    config, solution = _conflict_config()
+    monkeypatch.setattr(rooms, "MAX_NODES", 0)
+    assert rooms.assign_rooms(solution, config) == ("inconnu", None)
@@ -0,0 +1,22 @@
+import engine
+import sharding
+
+
+def _solution(config):
+    n_c, n_d, n_p = config["num_classes"], config["nombre_heures_jour"], config["nombre_profs"]
+    return {"planning": [[["Mathematiques"] * engine.NB_JOURS for _ in range(n_d)] for _ in range(n_c)],
+            "planning_salle": [[["S101"] * engine.NB_JOURS for _ in range(n_d)] for _ in range(n_c)],
+            "prefs": [[0] * (len(engine.MATIERES) + 1) for _ in range(n_p)],
+            "prof_to_class": [[1] * n_c for _ in range(n_p)]}
+
+
+def test_shard_hint_from_smaller_solution():
+    previous = _solution(engine.normalize_config({"num_classes": 3, "nombre_profs": 11}))
+    config = engine.normalize_config({"num_classes": 6, "nombre_profs": 20})
+    for shard in [{"classes": [1, 4, 5], "profs": [0, 5, 12, 15]}, {"classes": [4, 5, 6], "profs": [11, 19]}]:
+        shard["config"] = sharding.sub_config(config, shard["classes"], shard["profs"])
+        hint = sharding.shard_hint(previous, shard)
+        kept = [c for c in shard["classes"] if c <= 3]
+        assert len(hint["planning"]) == len(kept)
+        assert len(hint.get("prefs", [])) == len([p for p in shard["profs"] if p < 11])
+        engine.warm_start_annotation(hint, engine.normalize_config(shard["config"]))
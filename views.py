@@ -0,0 +1,141 @@
+"""Décodage vectorisé d'une solution et construction des vues (classes, profs, salles).
+
+La solution (listes imbriquées de noms) est décodée une seule fois en
+tableaux NumPy d'entiers ; la table d'une classe, d'un prof ou d'une salle en
+est déduite par indexation, à la demande (app.py n'affiche que l'entité
+choisie, export.py les écrit toutes).
+"""
+import numpy as np
+import pandas as pd
+
+from engine import MATIERES, NB_JOURS, SALLES
+
+JOURS = ["Lundi", "Mardi", "Mercredi", "Jeudi", "Vendredi"]
+VOID = len(MATIERES)  # indice de Void dans MATIERES + ["Void"]
+EMPTY = SALLES.index("Empty")
+
+# Couleur et graisse d'affichage de chaque matière (dernier = Void)
+COULEURS = {
+    "Mathematiques": ("#87CEFA", "bold"), "Physique": ("#87CEFA", "bold"),
+    "EnseignementScientifique": ("#87CEFA", "bold"),
+    "Anglais": ("#90EE90", "normal"), "Espagnol": ("#90EE90", "normal"),
+    "HistoireGeographie": ("#FFDAB9", "normal"), "Philosophie": ("#FFDAB9", "normal"),
+    "EPS": ("#D8BFD8", "normal"), "Option": ("#D8BFD8", "normal"),
+}
+
+
+def _codes(data, names):
+    # Noms -> indices (les valeurs inconnues deviennent le dernier indice : Void / Empty)
+    lookup = {name: i for i, name in enumerate(names)}
+    flat = [lookup.get(str(v), len(names) - 1) for v in np.ravel(np.array(data, dtype=object))]
+    return np.array(flat, dtype=np.int32).reshape(np.shape(data))
+
+
+def decode_solution(solution):
+    """Tableaux NumPy d'une solution (dictionnaire de listes, voir engine.solution_to_dict).
+
+    - matiere[c, d, w] : indice dans MATIERES + ["Void"]
+    - salle[c, d, w] : indice dans SALLES
+    - enseignant[c, m] : prof (indice à partir de 0) de la matière m dans la classe c, -1 sinon
+    - prof[c, d, w] : prof qui fait cours sur le créneau, -1 sinon
+    - utilise[p] : booléen, prof recruté
+    - prefs[p, m] : booléen, compétence du prof
+    """
+    matiere = _codes(solution["planning"], MATIERES + ["Void"])
+    n_c, n_d = matiere.shape[:2]
+    salle = _codes(solution["planning_salle"], SALLES) if solution.get("planning_salle") \
+        else np.full(matiere.shape, EMPTY, dtype=np.int32)
+    enseignant = np.full((n_c, VOID + 1), -1)
+    prefs = np.zeros((0, VOID + 1), dtype=bool)
+    utilise = np.zeros(0, dtype=bool)
+    if solution.get("prefs") and solution.get("prof_to_class"):
+        prefs = np.array(solution["prefs"], dtype=np.int32)[:, :VOID + 1] == 1
+        prefs = np.pad(prefs, ((0, 0), (0, VOID + 1 - prefs.shape[1])))
+        prefs[:, VOID] = False
+        prof_to_class = np.array(solution["prof_to_class"], dtype=np.int32)[:, :n_c] == 1
+        if solution.get("prof_est_utilise"):
+            utilise = np.array(solution["prof_est_utilise"], dtype=np.int32) == 1
+        else:
+            utilise = prof_to_class.any(axis=1)
+        # enseignant[c, m] : premier prof recruté affecté à c et compétent en m
+        candidats = (prof_to_class & utilise[:, None]).T[:, :, None] & prefs[None, :, :]  # [C, P, M]
+        enseignant = np.where(candidats.any(axis=1), candidats.argmax(axis=1), -1)
+    prof = enseignant[np.arange(n_c)[:, None, None], matiere]
+    return {"matiere": matiere, "salle": salle, "enseignant": enseignant, "prof": prof,
+            "utilise": utilise, "prefs": prefs, "n_heures": n_d}
+
+
+def heures_labels(n_heures):
+    return [f"H{d} ({d+7}h)" for d in range(1, n_heures + 1)]
+
+
+def _occupation(index, n, n_heures, valid):
+    # grille[i, d, w] = numéro de classe (à partir de 1) occupant la ressource i, 0 si libre
+    grille = np.zeros((n, n_heures, NB_JOURS), dtype=np.int32)
+    c, d, w = np.nonzero(valid)
+    grille[index[c, d, w], d, w] = c + 1
+    return grille
+
+
+def _classe_labels(grille):
+    labels = np.char.add("Classe ", grille.astype(str)).astype(object)
+    labels[grille == 0] = ""
+    return labels
+
+
+def _class_cells(decoded, c, sep):
+    # Texte de chaque créneau de la classe c : matière, prof et salle séparés par `sep`
+    matiere, salle, prof = decoded["matiere"][c], decoded["salle"][c], decoded["prof"][c]
+    texte = np.array(MATIERES + ["Void"], dtype=object)[matiere]
+    texte = texte + np.where(prof >= 0, np.char.add(np.char.add(f"{sep}(P", (prof + 1).astype(str)), ")").astype(object), "")
+    texte = texte + np.where(salle != EMPTY,
+                             np.char.add(np.char.add(f"{sep}[", np.array(SALLES)[salle]), "]").astype(object), "")
+    return texte
+
+
+def class_table(decoded, c):
+    """Table HTML (cellules colorées matière / prof / salle) de la classe c (à partir de 0)."""
+    matiere = decoded["matiere"][c]
+    styles = np.array([f'<span style="color: {c}; font-weight: {w};">'
+                       for c, w in (COULEURS.get(m, ("#FAFAFA", "normal")) for m in MATIERES + ["Void"])], dtype=object)
+    cellules = styles[matiere] + _class_cells(decoded, c, "<br>") + "</span>"
+    cellules[matiere == VOID] = '<span style="color: #555;"></span>'
+    index = heures_labels(decoded["n_heures"])
+    return pd.DataFrame(cellules, columns=JOURS, index=index).to_html(escape=False, index=True)
+
+
+def class_frame(decoded, c):
+    """Planning (DataFrame, texte « Matière (Pn) [Salle] ») de la classe c (à partir de 0)."""
+    cellules = _class_cells(decoded, c, " ")
+    cellules[decoded["matiere"][c] == VOID] = ""
+    return pd.DataFrame(cellules, columns=JOURS, index=heures_labels(decoded["n_heures"]))
+
+
+def occupations(decoded):
+    """Grilles d'occupation des profs [P, D, W] et des salles [S, D, W] (numéro de classe, 0 si libre)."""
+    prof, salle, n_heures = decoded["prof"], decoded["salle"], decoded["n_heures"]
+    return {"profs": _occupation(np.maximum(prof, 0), len(decoded["utilise"]), n_heures, prof >= 0),
+            "salles": _occupation(salle, len(SALLES), n_heures, salle != EMPTY)}
+
+
+def recruited(decoded):
+    """Profs recrutés (indices à partir de 0), dans l'ordre des numéros."""
+    return [int(p) for p in np.flatnonzero(decoded["utilise"])]
+
+
+def competences(decoded, p):
+    """Matières enseignables par le prof p (à partir de 0)."""
+    return [MATIERES[m] for m in np.flatnonzero(decoded["prefs"][p, :VOID])] or ["(Aucune)"]
+
+
+def teacher_frame(decoded, grilles, p):
+    """Planning (DataFrame) du prof p (à partir de 0) ; `grilles` vient de `occupations`."""
+    return pd.DataFrame(_classe_labels(grilles["profs"][p]), columns=JOURS, index=heures_labels(decoded["n_heures"]))
+
+
+ROOMS = [i for i in range(len(SALLES)) if i != EMPTY]  # salles affichées et exportées
+
+
+def room_frame(decoded, grilles, i):
+    """Occupation (DataFrame) de la salle d'indice i dans SALLES ; `grilles` vient de `occupations`."""
+    return pd.DataFrame(_classe_labels(grilles["salles"][i]), columns=JOURS, index=heures_labels(decoded["n_heures"]))